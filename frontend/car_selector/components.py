@@ -140,3 +140,29 @@ def create_nav_button(text: str) -> rx.Component:
         cursor="pointer",
     )
 
+
+
+def create_result_card(rec) -> rx.Component:
+    """Create a card for one streamed recommendation."""
+    return rx.box(
+        rx.vstack(
+            rx.hstack(
+                rx.text(rec["title"], font_size="20px", color=COLORS["black"], font_weight="600"),
+                rx.spacer(),
+                rx.text(rec["fit_score"], font_size="18px", color=COLORS["red_light"], font_weight="bold"),
+                width="100%",
+                align_items="center",
+            ),
+            rx.text(rec["reasons"], font_size="14px", color=COLORS["gray"]),
+            rx.cond(
+                rec["customizations"] != "",
+                rx.text("Suggested: ", rec["customizations"], font_size="14px", color=COLORS["black"]),
+            ),
+            spacing="2",
+            align_items="flex-start",
+            width="100%",
+        ),
+        **{k: v for k, v in STYLES["option_card"].items() if k != "cursor"},
+        bg=COLORS["white"],
+        border=f"2px solid {COLORS['gray_light']}",
+    )
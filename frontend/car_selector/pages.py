@@ -2,7 +2,7 @@
 import reflex as rx
 from .constants import COLORS, STYLES
 from .state import State
-from .components import create_option_card, create_chip, create_custom_input, create_question_layout, create_nav_button
+from .components import create_option_card, create_chip, create_custom_input, create_question_layout, create_nav_button, create_result_card
 
 
 def navbar() -> rx.Component:
@@ -245,6 +245,32 @@ def quiz_page() -> rx.Component:
     )
 
 
+def results_page() -> rx.Component:
+    """Results page; cards appear one by one as the recommender streams them."""
+    return rx.vstack(
+        navbar(),
+        rx.center(
+            rx.vstack(
+                rx.heading("Your Toyota matches", **STYLES["heading"]),
+                rx.foreach(State.recommendations, create_result_card),
+                rx.cond(
+                    State.results_loading,
+                    rx.hstack(
+                        rx.spinner(color=COLORS["red_light"]),
+                        rx.text(rx.cond(State.recommendations.length() > 0, "Finding more matches...", "Finding your matches..."),
+                                font_size="14px", color=COLORS["gray"]),
+                        spacing="3", align_items="center",
+                    ),
+                ),
+                rx.cond(State.results_error != "", rx.text(State.results_error, font_size="14px", color=COLORS["error"])),
+                spacing="4", width="100%", max_width="880px", padding_x="24", padding_y="40",
+            ),
+            width="100%",
+        ),
+        spacing="0", width="100%", min_height="100vh", align_items="stretch", bg=COLORS["white"],
+    )
+
+
 def index() -> rx.Component:
     """Main page component."""
     return rx.vstack(navbar(), hero_section(), spacing="0", width="100%", min_height="100vh", align_items="stretch")
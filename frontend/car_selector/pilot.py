@@ -0,0 +1,45 @@
+"""Bridge to the recommender in toyota-pilot/."""
+import json
+import os
+import sys
+
+import requests
+
+PILOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "toyota-pilot"))
+# e.g. http://127.0.0.1:8765 to use a running toyota-pilot/serve.py instead of an in-process engine
+PILOT_URL = os.environ.get("PILOT_URL", "").rstrip("/")
+
+
+def load_engine():
+    """The in-process RecommendationEngine; loads catalog and index once per process."""
+    if PILOT_DIR not in sys.path:
+        sys.path.insert(0, PILOT_DIR)
+    import recommend
+    return recommend.get_engine()
+
+
+def stream_recommendations(quiz: dict):
+    """Yield top_5 recommendations for quiz answers as they complete."""
+    if not PILOT_URL:
+        yield from load_engine().recommend_quiz_stream(quiz)
+        return
+    with requests.post(f"{PILOT_URL}/recommend/stream", json={"quiz": quiz}, stream=True, timeout=90) as r:
+        r.raise_for_status()
+        for line in r.iter_lines():
+            if not line:
+                continue
+            rec = json.loads(line)
+            if "error" in rec:
+                raise RuntimeError(rec["error"])
+            yield rec
+
+
+def to_card(rec: dict) -> dict:
+    """Flatten one top_5 entry into the string fields the results page renders."""
+    return {
+        "id": str(rec.get("id", "")),
+        "title": " ".join(str(rec[k]) for k in ("year", "model", "trim") if rec.get(k)),
+        "fit_score": str(rec.get("fit_score", "")),
+        "reasons": " • ".join(rec.get("reasons") or []),
+        "customizations": ", ".join(rec.get("recommended_customizations") or []),
+    }
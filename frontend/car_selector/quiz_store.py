@@ -0,0 +1,116 @@
+"""Append-only log of quiz submissions, one JSON line per submission.
+
+Event handlers only enqueue; a background thread writes queued submissions in batches
+and fsyncs once per batch, so the Reflex event loop never waits on disk. Lines look
+like {"session": ..., "ts": ..., "quiz": {...}} and can be fed straight to
+toyota-pilot/build_quiz_table.py --log for batch re-scoring.
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+QUIZ_LOG = os.environ.get("QUIZ_LOG", os.path.join("quiz_data", "quiz_responses.jsonl"))
+
+
+class QuizLog:
+    def __init__(self, path: str = QUIZ_LOG, batch: int = 256, flush_secs: float = 1.0, max_queue: int = 10_000):
+        self.path = path
+        self.batch = batch
+        self.flush_secs = flush_secs
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="quiz-log", daemon=True)
+        self._thread.start()
+
+    def append(self, session: str, quiz: dict) -> bool:
+        """Queue one submission; never blocks. False if it was dropped (queue full or log closed)."""
+        if self._closed.is_set():
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait({"session": session, "ts": time.time(), "quiz": quiz})
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        while True:
+            try:
+                rows = [self._queue.get(timeout=self.flush_secs)]
+            except queue.Empty:
+                if self._closed.is_set():
+                    return
+                continue
+            while len(rows) < self.batch:
+                try:
+                    rows.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # None only wakes the writer up on close
+            rows = [r for r in rows if r is not None]
+            if rows:
+                self._write(rows)
+            if self._closed.is_set() and self._queue.empty():
+                return
+
+    def _write(self, rows: list):
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows)
+        try:
+            # one O_APPEND write per batch, so concurrent app workers don't interleave lines
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self.written += len(rows)
+        except OSError as e:
+            self.errors += 1
+            print(f"Could not write quiz log {self.path}: {e}")
+
+    def close(self, timeout: float = 5.0):
+        """Flush what is queued and stop the writer."""
+        self._closed.set()
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass  # the writer is busy draining and will see the flag
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {"written": self.written, "queued": self._queue.qsize(), "dropped": self.dropped, "errors": self.errors}
+
+
+_LOG = None
+_LOG_LOCK = threading.Lock()
+
+
+def quiz_log() -> QuizLog:
+    """The per-process QuizLog, started on first use and flushed at exit."""
+    global _LOG
+    with _LOG_LOCK:
+        if _LOG is None:
+            _LOG = QuizLog()
+            atexit.register(_LOG.close)
+        return _LOG
+
+
+def read_sessions(path: str = QUIZ_LOG) -> dict:
+    """{session: [submissions, oldest first]} from the log."""
+    out = {}
+    if not os.path.exists(path):
+        return out
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue  # blank, or a line torn by a crash mid-write
+            out.setdefault(row.get("session", ""), []).append(row)
+    return out
@@ -1,8 +1,9 @@
 
 """Application state management."""
 import reflex as rx
-import json
-import os
+import asyncio
+from .pilot import stream_recommendations, to_card
+from .quiz_store import quiz_log
 
 
 class State(rx.State):
@@ -54,6 +55,11 @@ class State(rx.State):
     msrp_over_55k: bool = False
     msrp_no_preference: bool = False
     
+    # Results page, filled one card at a time while finalize streams
+    recommendations: list[dict[str, str]] = []
+    results_loading: bool = False
+    results_error: str = ""
+    
     def set_custom_road_condition(self, value: str):
         self.custom_road_condition = value
     
@@ -184,16 +190,12 @@ class State(rx.State):
             "question_5": {"question": "What is your MSRP price preference?", "selected_options": get_selected(q5_options)},
         }
     
-    def save_quiz_to_file(self):
-        """Save quiz data to a single JSON file (overwrites existing)."""
-        quiz_data = self.get_quiz_data()
-        data_dir = "quiz_data"
-        if not os.path.exists(data_dir):
-            os.makedirs(data_dir)
-        filename = f"{data_dir}/quiz_response.json"
-        with open(filename, "w") as f:
-            json.dump(quiz_data, f, indent=2)
-        self.save_message = f"Quiz saved to {filename}"
+    def save_quiz(self):
+        """Queue this session's answers for the append-only quiz log (written in the background)."""
+        if quiz_log().append(self.router.session.client_token, self.get_quiz_data()):
+            self.save_message = "Quiz saved"
+        else:
+            self.save_message = "Quiz could not be saved"
     
     def validate_and_next(self):
         """Validate current step and proceed."""
@@ -230,7 +232,31 @@ class State(rx.State):
                 self.validation_error = "Please select a price range."
                 return
             self.validation_error = ""
-            self.save_quiz_to_file()
+            self.save_quiz()
+            return [rx.redirect("/results"), State.stream_recommendations]
+    
+    @rx.event(background=True)
+    async def stream_recommendations(self):
+        """Run the recommender off the event loop and push each top_5 pick as it completes."""
+        async with self:
+            quiz = self.get_quiz_data()
+            self.recommendations = []
+            self.results_error = ""
+            self.results_loading = True
+        try:
+            # the first next() also loads the engine, so it runs on a worker thread too
+            stream = stream_recommendations(quiz)
+            while True:
+                rec = await asyncio.to_thread(next, stream, None)
+                if rec is None:
+                    break
+                async with self:
+                    self.recommendations = self.recommendations + [to_card(rec)]
+        except Exception as e:
+            async with self:
+                self.results_error = f"Could not load recommendations: {e}"
+        async with self:
+            self.results_loading = False
     
     def go_back(self):
         """Go back to previous question."""
@@ -0,0 +1,53 @@
+# bench_ann.py
+# recall@k and latency of IVFIndex against exact flat search, on the trim vector store
+# or on a synthetic clustered catalog (the real one is too small to say much).
+import time, argparse, numpy as np
+from vector_index import VectorIndex, IVFIndex, l2_normalize
+from vector_store import open_store
+
+def synthetic(n, dim, clusters=200, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    X = centers[rng.integers(clusters, size=n)] + 0.5 * rng.standard_normal((n, dim))
+    return [str(i) for i in range(n)], X.astype(np.float32)
+
+def timed(fn, queries):
+    t0 = time.perf_counter()
+    out = [fn(q) for q in queries]
+    return out, (time.perf_counter() - t0) * 1000 / len(queries)
+
+def main():
+    ap = argparse.ArgumentParser(description="recall@k of IVF vs exact search")
+    ap.add_argument("--store", default=None, help="vector store base path (default: synthetic data)")
+    ap.add_argument("--n", type=int, default=50_000)
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--nlist", type=int, default=None)
+    ap.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = ap.parse_args()
+
+    if args.store:
+        ids, mat, _ = open_store(args.store)
+    else:
+        ids, mat = synthetic(args.n, args.dim)
+    rng = np.random.default_rng(1)
+    # queries: perturbed catalog rows, like a profile that lands near a few trims
+    Q = l2_normalize(mat[rng.integers(len(ids), size=args.queries)])
+    Q = l2_normalize(Q + 0.3 * rng.standard_normal(Q.shape).astype(np.float32) / np.sqrt(Q.shape[1]))
+
+    flat = VectorIndex(ids, mat)
+    t0 = time.perf_counter()
+    ivf = IVFIndex(ids, mat, nlist=args.nlist)
+    build_s = time.perf_counter() - t0
+    exact, flat_ms = timed(lambda q: flat.search(q, args.k)[0], Q)
+
+    print(f"{len(ids)} rows x {flat.dim} dims, {ivf.nlist} lists (built in {build_s:.1f}s), k={args.k}")
+    print(f"flat: {flat_ms:.3f} ms/query")
+    for nprobe in args.nprobe:
+        got, ms = timed(lambda q: ivf.search(q, args.k, nprobe=nprobe)[0], Q)
+        recall = np.mean([len(set(a) & set(b)) / len(a) for a, b in zip(exact, got)])
+        print(f"ivf nprobe={nprobe:>3}: recall@{args.k}={recall:.3f}  {ms:.3f} ms/query  ({flat_ms / ms:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# bench_catalog.py
+# Memory per trim and hard-filter latency of the columnar Catalog against the plain
+# json.load dicts it replaces. The catalog is replicated to --n trims with unique ids.
+import os, json, time, argparse, tracemalloc
+from catalog import Catalog, flatten_catalog
+from constraints import ConstraintIndex, as_list, max_price
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PROFILE = {"powertrain_pref": ["hybrid"], "drive_type": "AWD", "budget_total_usd": {"target": 40000, "flex_pct": 5}}
+
+def replicate(trims, n):
+    return [{**trims[i % len(trims)], "id": f"{trims[i % len(trims)]['id']}-{i}"} for i in range(n)]
+
+def dict_feasible(trims, prof):
+    """The per-trim loop over dicts the columnar filter replaces."""
+    fuels = {f.lower() for f in as_list(prof.get("powertrain_pref"))}
+    drives = {d.upper() for d in as_list(prof.get("drive_type"))} | {"4X4", "4WD"}
+    cap = max_price(prof.get("budget_total_usd"))
+    return [t for t in trims
+            if (not fuels or t.get("fuel_type", "").lower() in fuels)
+            and (not drives or t.get("drive_type", "").upper() in drives)
+            and (cap is None or (t.get("msrp_usd") or 0) <= cap)]
+
+def retained(build):
+    tracemalloc.start()
+    obj = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size
+
+def timed(fn, reps):
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        fn()
+    return (time.perf_counter() - t0) / reps * 1000
+
+def main():
+    ap = argparse.ArgumentParser(description="dict vs columnar catalog: memory and filter latency")
+    ap.add_argument("--vehicles", default=os.path.join(HERE, "data", "vehicles.json"))
+    ap.add_argument("--n", type=int, default=50_000)
+    ap.add_argument("--reps", type=int, default=20)
+    args = ap.parse_args()
+
+    base = flatten_catalog(json.load(open(args.vehicles)))
+    text = json.dumps(replicate(base, args.n))
+    trims, dict_bytes = retained(lambda: json.loads(text))
+    cat, cat_bytes = retained(lambda: Catalog(flatten_catalog(json.loads(text))))
+    cons = ConstraintIndex(cat.ids, cat)
+
+    dict_ms = timed(lambda: dict_feasible(trims, PROFILE), args.reps)
+    col_ms = timed(lambda: cons.feasible(PROFILE), args.reps)
+    print(f"{'':10} {'bytes/trim':>11} {'filter ms':>10}")
+    print(f"{'dicts':10} {dict_bytes / args.n:11.0f} {dict_ms:10.2f}")
+    print(f"{'catalog':10} {cat_bytes / args.n:11.0f} {col_ms:10.2f}   (numpy columns alone: {cat.nbytes / args.n:.0f} B/trim)")
+
+if __name__ == "__main__":
+    main()
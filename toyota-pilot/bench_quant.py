@@ -0,0 +1,64 @@
+# bench_quant.py
+# Memory per trim and ranking agreement (overlap of top-k with full float32 search) for
+# each compressed storage mode. Synthetic rows get a decaying per-dimension spectrum so
+# truncation behaves roughly like a Matryoshka-trained model; pass --store for real data.
+import time, argparse, numpy as np
+from vector_index import VectorIndex
+from vector_store import open_store
+from quantize import Int8Index, PQIndex
+
+def synthetic(n, dim, clusters=300, seed=0):
+    rng = np.random.default_rng(seed)
+    spectrum = 1.0 / np.sqrt(1 + np.arange(dim) / 32)
+    centers = rng.standard_normal((clusters, dim)) * spectrum
+    X = centers[rng.integers(clusters, size=n)] + 0.6 * rng.standard_normal((n, dim)) * spectrum
+    return [str(i) for i in range(n)], X.astype(np.float32)
+
+def main():
+    ap = argparse.ArgumentParser(description="memory vs ranking agreement of quantized vector storage")
+    ap.add_argument("--store", default=None)
+    ap.add_argument("--n", type=int, default=20_000)
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    args = ap.parse_args()
+
+    if args.store:
+        ids, mat, _ = open_store(args.store)
+        mat = np.asarray(mat, dtype=np.float32)
+    else:
+        ids, mat = synthetic(args.n, args.dim)
+    rng = np.random.default_rng(1)
+    Q = mat[rng.integers(len(ids), size=args.queries)]
+    Q = Q + 0.5 * rng.standard_normal(Q.shape).astype(np.float32) * Q.std(axis=0)
+
+    base = VectorIndex(ids, mat)
+    ref = [set(base.search(q, args.k)[0]) for q in Q]
+    dim = mat.shape[1]
+    modes = [
+        ("float32", lambda: base),
+        ("float16", lambda: VectorIndex(ids, base.mat.astype(np.float16), normalized=True)),
+        ("int8", lambda: Int8Index(ids, mat)),
+        ("pq m=dim/8", lambda: PQIndex(ids, mat, m=dim // 8)),
+        ("pq m=dim/16", lambda: PQIndex(ids, mat, m=dim // 16)),
+        ("dims=512", lambda: VectorIndex(ids, mat, dims=512)),
+        ("dims=256", lambda: VectorIndex(ids, mat, dims=256)),
+        ("int8 dims=512", lambda: Int8Index(ids, mat, dims=512)),
+        ("int8 dims=256", lambda: Int8Index(ids, mat, dims=256)),
+    ]
+    print(f"{len(ids)} rows x {dim} dims, {len(Q)} queries, agreement = |top{args.k} ∩ float32 top{args.k}| / {args.k}")
+    print(f"{'mode':<16}{'bytes/row':>10}{'saving':>9}{'agree@k':>9}{'top1':>7}{'ms/query':>10}")
+    for name, build in modes:
+        if "dims=" in name and int(name.split("dims=")[1]) >= dim:
+            continue
+        ix = build()
+        nbytes = ix.nbytes
+        t0 = time.perf_counter()
+        got = [ix.search(q, args.k)[0] for q in Q]
+        ms = (time.perf_counter() - t0) * 1000 / len(Q)
+        agree = np.mean([len(r & set(g)) / args.k for r, g in zip(ref, got)])
+        top1 = np.mean([g[0] == base.search(q, 1)[0][0] for g, q in zip(got, Q)])
+        print(f"{name:<16}{nbytes / len(ids):>10.0f}{base.nbytes / nbytes:>8.1f}x{agree:>9.3f}{top1:>7.2f}{ms:>10.3f}")
+
+if __name__ == "__main__":
+    main()
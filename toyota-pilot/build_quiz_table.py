@@ -0,0 +1,90 @@
+# build_quiz_table.py
+# Offline job: enumerate quiz submissions, map each to its deterministic profile, rank
+# candidates for every distinct profile with batched embeddings, optionally finalize
+# them, and store the results in data/quiz_table.sqlite for RecommendationEngine.lookup_quiz.
+# The enumerated space is what the quiz's validation accepts with one option on each of
+# questions 1-3: 5 x 5 x 5 x (1 or 2 of 8 features) x 6 buckets = 27,000 submissions.
+# Multi-select combinations come from logged submissions (--log), most frequent first.
+import os, glob, json, argparse, itertools
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from recommend import DATA_DIR, RecommendationEngine
+from quiz_profile import QUESTION_RULES, QUIZ_FIELDS, MSRP_BUCKETS, MAX_FEATURES
+from quiz_table import quiz_key, read_submissions
+
+def make_quiz(answers):
+    """{question: [option labels]} -> State.get_quiz_data shape with no custom text."""
+    return {q: {"selected_options": list(answers.get(q, [])), "custom_answer": ""} for q in QUIZ_FIELDS}
+
+def enumerate_quizzes():
+    q1, q2, q3, q4 = (list(QUESTION_RULES[q]) for q in ("question_1", "question_2", "question_3", "question_4"))
+    feature_sets = [list(c) for n in range(1, MAX_FEATURES + 1) for c in itertools.combinations(q4, n)]
+    for a, b, c, feats, bucket in itertools.product(q1, q2, q3, feature_sets, MSRP_BUCKETS):
+        yield make_quiz({"question_1": [a], "question_2": [b], "question_3": [c],
+                         "question_4": feats, "question_5": [bucket]})
+
+def logged_quizzes(patterns, top):
+    """The `top` most frequent submissions in quiz_response.json files or JSONL logs."""
+    counts, first = Counter(), {}
+    for pattern in patterns:
+        for path in glob.glob(pattern):
+            for row in read_submissions(path):
+                quiz = row.get("quiz", row)
+                sig = json.dumps({q: (quiz.get(q) or {}) for q in QUIZ_FIELDS}, sort_keys=True)
+                counts[sig] += 1
+                first.setdefault(sig, quiz)
+    return [first[sig] for sig, _ in counts.most_common(top)]
+
+def main():
+    ap = argparse.ArgumentParser(description="Precompute recommendations for the finite quiz answer space")
+    ap.add_argument("--data-dir", default=DATA_DIR)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--log", nargs="*", default=[], help="quiz_response.json files or JSONL logs (globs)")
+    ap.add_argument("--top", type=int, default=10_000, help="most frequent logged submissions to include")
+    ap.add_argument("--no-enumerate", action="store_true", help="only precompute logged submissions")
+    ap.add_argument("--finalize", choices=["none", "local", "llm"], default="local")
+    ap.add_argument("--workers", type=int, default=8, help="concurrent finalize calls with --finalize llm")
+    ap.add_argument("--batch", type=int, default=256, help="profiles embedded and ranked per batch")
+    ap.add_argument("--full", action="store_true", help="recompute rows that are already current")
+    args = ap.parse_args()
+
+    if not os.environ.get("OPENROUTER_API_KEY"):
+        raise SystemExit("Set OPENROUTER_API_KEY first: export OPENROUTER_API_KEY='sk-or-...'")
+    engine = RecommendationEngine(args.data_dir)
+    snap, table = engine.snapshot, engine.quiz_table
+    version = snap.data_version
+    purged = table.purge(version)
+    done = set() if args.full else table.keys(version)
+
+    quizzes = [] if args.no_enumerate else list(enumerate_quizzes())
+    quizzes += logged_quizzes(args.log, args.top)
+    # many submissions share a profile; rank each distinct profile once
+    profiles, skipped = {}, 0
+    for quiz in quizzes:
+        prof, unknown = snap.quiz.extract(quiz)
+        if unknown:
+            skipped += 1
+            continue
+        profiles.setdefault(quiz_key(prof, args.k), prof)
+    todo = [(key, prof) for key, prof in profiles.items() if key not in done]
+    print(f"{len(quizzes)} submissions -> {len(profiles)} profiles ({skipped} with unrecognized custom text), "
+          f"{len(todo)} to compute, {purged} stale rows dropped")
+
+    def finalize(item):
+        prof, candidates = item
+        return engine.finalize(prof, candidates, snap=snap, mode=args.finalize)
+
+    mode = None if args.finalize == "none" else args.finalize
+    with ThreadPoolExecutor(max_workers=args.workers if args.finalize == "llm" else 1) as pool:
+        for i in range(0, len(todo), args.batch):
+            batch = todo[i:i + args.batch]
+            cands = engine.recommend_batch([prof for _, prof in batch], k=args.k, snap=snap)
+            results = list(pool.map(finalize, zip((p for _, p in batch), cands))) if mode else [None] * len(batch)
+            table.put_many(version, [(key, c, r, mode) for (key, _), c, r in zip(batch, cands, results)])
+            print(f"  {min(i + args.batch, len(todo))}/{len(todo)}")
+
+    print(f"✅ {table.stats()['rows']} precomputed answers in {os.path.join(args.data_dir, 'quiz_table.sqlite')}")
+    engine.close()
+
+if __name__ == "__main__":
+    main()
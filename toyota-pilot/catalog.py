@@ -0,0 +1,191 @@
+# catalog.py
+# Columnar in-memory catalog. vehicles.json comes in two shapes: flat trim records, and
+# model records with nested "trims" (frontend/data.json). Both are flattened to one row
+# per trim and stored as NumPy columns: strings interned to int32 codes, year/msrp/mpg as
+# numeric arrays, and the variable-length lists (features, packages and what they add,
+# colors, style tags) as CSR offset/index arrays. Package and color prices (price_usd) are
+# float32 columns, NaN where the catalog doesn't say. record(row) rebuilds the plain dict
+# for the few rows that end up in a prompt or a response.
+import json, numpy as np
+
+# model-level fields a nested trim inherits when it doesn't set them itself
+INHERITED = ("model", "year", "body_type", "drive_type", "fuel_type", "style_vibe", "detail_url")
+MPG_KEYS = ("city", "highway", "combined")
+
+class Vocab:
+    """String interning table; code 0 is the empty/unknown string."""
+    __slots__ = ("items", "code")
+
+    def __init__(self):
+        self.items = [""]
+        self.code = {"": 0}
+
+    def add(self, s):
+        s = "" if s is None else str(s)
+        c = self.code.get(s)
+        if c is None:
+            c = self.code[s] = len(self.items)
+            self.items.append(s)
+        return c
+
+    def __len__(self):
+        return len(self.items)
+
+def flatten_catalog(entries):
+    """One dict per trim from flat records and/or models with nested "trims".
+
+    A model record that also carries its own id and trim (the older flat form) stays a
+    row. Nested trims inherit INHERITED fields from their model and use "name" as the
+    trim label. When an id repeats, the first record wins and later ones only fill the
+    fields it is missing.
+    """
+    if isinstance(entries, dict):
+        entries = entries.get("vehicles") or entries.get("models") or []
+    rows, by_id = [], {}
+
+    def add(rec):
+        tid = rec.get("id")
+        if not tid:
+            return
+        if tid in by_id:
+            cur = by_id[tid]
+            for k, v in rec.items():
+                cur.setdefault(k, v)
+            return
+        by_id[tid] = rec
+        rows.append(rec)
+
+    for e in entries:
+        nested = e.get("trims") or []
+        if e.get("id") and (e.get("trim") or not nested):
+            add({k: v for k, v in e.items() if k != "trims"})
+        base = {k: e[k] for k in INHERITED if k in e}
+        for t in nested:
+            rec = {**base, **t}
+            rec.setdefault("trim", rec.pop("name", ""))
+            add(rec)
+    return rows
+
+def _prices(items):
+    return np.array([np.nan if x.get("price_usd") is None else x["price_usd"] for x in items], dtype=np.float32)
+
+def _csr(lists):
+    """(offsets, flat values) for a list of int lists."""
+    ptr = np.zeros(len(lists) + 1, dtype=np.int32)
+    ptr[1:] = np.cumsum([len(x) for x in lists])
+    flat = np.fromiter((v for x in lists for v in x), dtype=np.int32, count=int(ptr[-1]))
+    return ptr, flat
+
+class Catalog:
+    __slots__ = (
+        "ids", "row", "strings", "features",
+        "model", "trim", "body", "drive", "fuel", "url", "image",
+        "year", "msrp", "mpg",
+        "feat_ptr", "feat_idx", "style_ptr", "style_idx",
+        "pkg_ptr", "pkg_name", "pkg_price", "pkg_add_ptr", "pkg_add_idx",
+        "color_ptr", "color_name", "color_extra", "color_price",
+    )
+
+    def __init__(self, trims):
+        n = len(trims)
+        S, F = Vocab(), Vocab()
+        self.strings, self.features = S, F
+        self.ids = [t["id"] for t in trims]
+        self.row = {tid: i for i, tid in enumerate(self.ids)}
+        code = lambda key: np.fromiter((S.add(t.get(key)) for t in trims), dtype=np.int32, count=n)
+        self.model, self.trim = code("model"), code("trim")
+        self.body, self.drive, self.fuel = code("body_type"), code("drive_type"), code("fuel_type")
+        self.url, self.image = code("detail_url"), code("image")
+        self.year = np.array([t.get("year") or 0 for t in trims], dtype=np.int16)
+        self.msrp = np.array([t.get("msrp_usd") or np.nan for t in trims], dtype=np.float32)
+        self.mpg = np.full((n, len(MPG_KEYS)), np.nan, dtype=np.float32)
+        for r, t in enumerate(trims):
+            for j, k in enumerate(MPG_KEYS):
+                v = (t.get("mpg") or {}).get(k)
+                if v is not None:
+                    self.mpg[r, j] = v
+        self.feat_ptr, self.feat_idx = _csr([[F.add(f) for f in t.get("features", [])] for t in trims])
+        self.style_ptr, self.style_idx = _csr([[S.add(s) for s in t.get("style_vibe", [])] for t in trims])
+        pkgs = [t.get("packages", []) for t in trims]
+        self.pkg_ptr, self.pkg_name = _csr([[S.add(p.get("name")) for p in ps] for ps in pkgs])
+        self.pkg_price = _prices(p for ps in pkgs for p in ps)
+        self.pkg_add_ptr, self.pkg_add_idx = _csr([[F.add(f) for f in p.get("adds", [])] for ps in pkgs for p in ps])
+        colors = [t.get("colors", []) for t in trims]
+        self.color_ptr, self.color_name = _csr([[S.add(c.get("name")) for c in cs] for cs in colors])
+        self.color_extra = np.array([bool(c.get("extra_cost")) for cs in colors for c in cs], dtype=bool)
+        # a color without extra_cost is free even when no price is given
+        self.color_price = np.where(self.color_extra, _prices(c for cs in colors for c in cs), 0).astype(np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, k).nbytes for k in self.__slots__ if isinstance(getattr(self, k), np.ndarray))
+
+    def rows(self, ids):
+        """Row index per id, -1 for ids the catalog doesn't have."""
+        return np.array([self.row.get(tid, -1) for tid in ids], dtype=np.int64)
+
+    def string(self, col, r):
+        return self.strings.items[getattr(self, col)[r]]
+
+    def feature_ids(self, r):
+        return self.feat_idx[self.feat_ptr[r]:self.feat_ptr[r + 1]]
+
+    def features_of(self, r):
+        return [self.features.items[i] for i in self.feature_ids(r)]
+
+    def package_range(self, r):
+        return range(self.pkg_ptr[r], self.pkg_ptr[r + 1])
+
+    def package_adds(self, p):
+        """Feature ids added by global package index p."""
+        return self.pkg_add_idx[self.pkg_add_ptr[p]:self.pkg_add_ptr[p + 1]]
+
+    def color_range(self, r):
+        return range(self.color_ptr[r], self.color_ptr[r + 1])
+
+    def packages_of(self, r):
+        return [_priced({"name": self.strings.items[self.pkg_name[p]],
+                         "adds": [self.features.items[i] for i in self.package_adds(p)]}, self.pkg_price[p])
+                for p in self.package_range(r)]
+
+    def colors_of(self, r):
+        return [_priced({"name": self.strings.items[self.color_name[c]], "extra_cost": bool(self.color_extra[c])},
+                        self.color_price[c] if self.color_extra[c] else np.nan)
+                for c in self.color_range(r)]
+
+    def style_of(self, r):
+        return [self.strings.items[i] for i in self.style_idx[self.style_ptr[r]:self.style_ptr[r + 1]]]
+
+    def record(self, r):
+        """The trim as a plain dict (the flat vehicles.json shape)."""
+        rec = {
+            "id": self.ids[r],
+            "model": self.string("model", r),
+            "year": int(self.year[r]) or None,
+            "trim": self.string("trim", r),
+            "body_type": self.string("body", r),
+            "drive_type": self.string("drive", r),
+            "fuel_type": self.string("fuel", r),
+            "msrp_usd": None if np.isnan(self.msrp[r]) else int(self.msrp[r]),
+            "features": self.features_of(r),
+            "packages": self.packages_of(r),
+            "colors": self.colors_of(r),
+            "style_vibe": self.style_of(r),
+            "detail_url": self.string("url", r),
+            "image": self.string("image", r),
+        }
+        if not np.isnan(self.mpg[r]).all():
+            rec["mpg"] = {k: int(v) for k, v in zip(MPG_KEYS, self.mpg[r]) if not np.isnan(v)}
+        return rec
+
+def _priced(rec, price):
+    if not np.isnan(price):
+        rec["price_usd"] = int(price)
+    return rec
+
+def load_catalog(path):
+    with open(path) as f:
+        return Catalog(flatten_catalog(json.load(f)))
@@ -0,0 +1,187 @@
+# configure.py
+# Per-trim build optimizer. Must-haves and nice-to-haves the trim lacks become bits of a
+# small requirement mask; a DP over the masks reachable from the trim's packages keeps the
+# cheapest package set per mask (each package used at most once), so cost grows with the
+# number of distinct masks, not 2^packages. Sets dearer than the cheapest full cover are
+# cut while solving, and a set is dropped afterwards when a superset of what it covers is
+# no dearer. Masks are capped at MAX_BITS requirements: nice-to-haves are dropped first,
+# and a trim missing more must-haves than that gets a greedy cover instead of the DP.
+# The table depends only on the trim and the requirement set and is memoized on that; picking the best affordable entry and a paint color under budget_total_usd
+# target + flex_pct runs on top of it per request.
+import threading, numpy as np
+from collections import OrderedDict
+from constraints import max_price
+
+UNPRICED_PACKAGE_USD = 1000   # assumed for packages the catalog has no price_usd for
+UNPRICED_COLOR_USD = 425      # assumed for extra_cost colors without a price_usd
+MAX_NICE = 8                  # nice-to-haves past this are left out of the mask
+MAX_BITS = 12                 # requirement bits the DP solves exactly; more musts go greedy
+
+def popcount(x):
+    return bin(x).count("1")
+
+def _frontier(states, nbits):
+    """States not dominated by a strict superset mask of equal or lower cost."""
+    if len(states) < 2:
+        return states
+    idx = np.arange(1 << nbits)
+    sup = np.full(1 << nbits, np.inf)
+    for mask, (cost, _) in states.items():
+        sup[mask] = cost
+    # sup[mask] = cheapest state covering at least mask (superset-min transform), then
+    # strict[mask] = cheapest state covering a strict superset of mask
+    strict = np.full(1 << nbits, np.inf)
+    for b in range(nbits):
+        lo = idx[(idx >> b & 1) == 0]
+        sup[lo] = np.minimum(sup[lo], sup[lo | 1 << b])
+    for b in range(nbits):
+        lo = idx[(idx >> b & 1) == 0]
+        strict[lo] = np.minimum(strict[lo], sup[lo | 1 << b])
+    return {mask: st for mask, st in states.items() if st[0] < strict[mask]}
+
+class Configurator:
+    def __init__(self, catalog, max_memo=4096):
+        self.catalog = catalog
+        self.max_memo = max_memo
+        self.hits = 0
+        self.misses = 0
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+
+    def table(self, r, reqs):
+        """{requirement mask: (cost, package indexes)} for trim row r; reqs are feature ids."""
+        key = (r, reqs)
+        with self._lock:
+            table = self._memo.get(key)
+            if table is not None:
+                self._memo.move_to_end(key)
+                self.hits += 1
+                return table
+            self.misses += 1
+        table = self._solve(r, reqs)
+        with self._lock:
+            self._memo[key] = table
+            while len(self._memo) > self.max_memo:
+                self._memo.popitem(last=False)
+        return table
+
+    def _packages(self, r, reqs):
+        """(package index, requirement mask, price) for the trim's packages that add a requirement."""
+        cat = self.catalog
+        bit = {f: i for i, f in enumerate(reqs)}
+        out = []
+        for p in cat.package_range(r):
+            m = 0
+            for f in cat.package_adds(p):
+                b = bit.get(int(f))
+                if b is not None:
+                    m |= 1 << b
+            if m:
+                out.append((p, m, UNPRICED_PACKAGE_USD if np.isnan(cat.pkg_price[p]) else float(cat.pkg_price[p])))
+        return out
+
+    def _solve(self, r, reqs):
+        if len(reqs) > MAX_BITS:
+            return self._greedy(r, reqs)
+        full = (1 << len(reqs)) - 1
+        states = {0: (0.0, ())}
+        for p, m, price in self._packages(r, reqs):
+            # snapshot of the states before this package: each package is taken at most once
+            for mask, (cost, chosen) in list(states.items()):
+                nm = mask | m
+                if nm == mask:
+                    continue
+                # bound: the full cover dominates anything that costs more than it
+                bound = states.get(full, (np.inf,))[0]
+                if cost + price >= bound:
+                    continue
+                cur = states.get(nm)
+                if cur is None or cost + price < cur[0]:
+                    states[nm] = (cost + price, chosen + (p,))
+        return _frontier(states, len(reqs))
+
+    def _greedy(self, r, reqs):
+        """One-entry table for too many requirements to solve exactly: repeatedly take the
+        package with the lowest price per newly covered requirement, then drop packages the
+        others already cover."""
+        pkgs = self._packages(r, reqs)
+        mask, picked = 0, []
+        while True:
+            gain = [(price / popcount(m & ~mask), i) for i, (_, m, price) in enumerate(pkgs) if m & ~mask]
+            if not gain:
+                break
+            i = min(gain)[1]
+            mask |= pkgs[i][1]
+            picked.append(i)
+        for i in reversed(list(picked)):
+            rest = 0
+            for j in picked:
+                if j != i:
+                    rest |= pkgs[j][1]
+            if rest == mask:
+                picked.remove(i)
+        picked.sort()
+        return {mask: (sum(pkgs[i][2] for i in picked), tuple(pkgs[i][0] for i in picked))}
+
+    def _color(self, r, left, prefs):
+        """(name, price, matched a preference): the cheapest preferred color that fits `left`
+        dollars, else the cheapest color that fits, else the cheapest color."""
+        cat = self.catalog
+        opts = []
+        for c in cat.color_range(r):
+            price = float(cat.color_price[c])
+            if np.isnan(price):
+                price = UNPRICED_COLOR_USD
+            opts.append((cat.strings.items[cat.color_name[c]], price))
+        if not opts:
+            return None, 0.0, False
+        wanted = [o for o in opts if o[1] <= left and any(p in o[0].lower() for p in prefs)]
+        name, price = min(wanted or opts, key=lambda o: (o[1] > left, o[1]))
+        return name, price, any(p in name.lower() for p in prefs)
+
+    def configure(self, r, musts, nices=(), budget=None, colors=()):
+        """Cheapest package set covering the missing must-haves, then as many nice-to-haves
+        as fit the budget, plus a color. Returns a JSON-ready dict."""
+        cat = self.catalog
+        code = cat.features.code
+        base = set(cat.feature_ids(r).tolist())
+        # only what some package of this trim adds gets a bit; the rest can't be bought
+        addable = {int(f) for p in cat.package_range(r) for f in cat.package_adds(p)} - base
+        wanted_m = {code[f] for f in musts if f in code} - base
+        need_m = sorted(wanted_m & addable)
+        need_n = sorted(({code[f] for f in nices if f in code} & addable) - wanted_m)
+        need_n = need_n[:max(0, min(MAX_NICE, MAX_BITS - len(need_m)))]
+        missing = sorted([f for f in musts if f not in code] + [cat.features.items[f] for f in wanted_m - addable])
+        states = self.table(r, tuple(need_m + need_n))
+
+        cap = max_price(budget)
+        msrp = float(cat.msrp[r])
+        headroom = np.inf if cap is None or np.isnan(msrp) else cap - msrp
+        must_mask = (1 << len(need_m)) - 1
+        # musts first, then staying within budget, then nice-to-haves (only while within
+        # budget; once over it, extras only add cost), then cost
+        def rank(s):
+            fits = s[1][0] <= headroom
+            return popcount(s[0] & must_mask), fits, popcount(s[0] >> len(need_m)) if fits else 0, -s[1][0]
+        mask, (cost, chosen) = max(states.items(), key=rank)
+
+        color, color_cost, matched = self._color(r, headroom - cost, [c.lower() for c in colors if c])
+        reqs = need_m + need_n
+        covered = {reqs[i] for i in range(len(reqs)) if mask >> i & 1}
+        total = None if np.isnan(msrp) else int(msrp + cost + color_cost)
+        return {
+            "packages": [cat.strings.items[cat.pkg_name[p]] for p in chosen],
+            "color": color,
+            "color_matched": matched,
+            "package_cost_usd": int(cost),
+            "color_cost_usd": int(color_cost),
+            "total_usd": total,
+            "adds": [cat.features.items[f] for f in reqs if f in covered],
+            "missing_must_have": missing + [cat.features.items[f] for f in need_m if f not in covered],
+            "within_budget": cap is None or total is None or total <= cap,
+        }
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._memo)}
@@ -0,0 +1,76 @@
+# constraints.py
+# Hard-constraint columns (powertrain, drive, body, price) aligned with the vector index
+# rows, so the feasible set can be computed before ranking instead of after it. String
+# columns are normalized small-int codes taken from the columnar catalog.
+import numpy as np
+
+ANY = {"", "any", "no-strong-preference", "no preference", "none"}
+DRIVE_ALIASES = {"4X4": "4WD", "ALL WHEEL DRIVE": "AWD", "FOUR WHEEL DRIVE": "4WD"}
+# an AWD request is also met by 4WD; the reverse is not true
+DRIVE_ACCEPTS = {"AWD": {"AWD", "4WD"}}
+
+def norm_drive(v):
+    v = (v or "").strip().upper()
+    return DRIVE_ALIASES.get(v, v)
+
+def as_list(v):
+    if v is None:
+        return []
+    if isinstance(v, str):
+        v = [v]
+    return [x for x in v if x and x.strip().lower() not in ANY]
+
+def max_price(budget):
+    """Upper MSRP bound from budget_total_usd {target, flex_pct}; None when unset."""
+    if not isinstance(budget, dict):
+        return None
+    target = budget.get("target") or 0
+    if target <= 0:
+        return None
+    return target * (1 + (budget.get("flex_pct") or 0) / 100)
+
+def _codes(catalog, col, rows, norm):
+    """Normalized small-int codes of one catalog column for rows; 0 = unknown (or no row)."""
+    valid = rows >= 0
+    raw = np.where(valid, col[np.maximum(rows, 0)], 0)
+    uniq = np.unique(raw)
+    vocab = {"": 0}
+    lut = np.zeros(int(uniq.max()) + 1 if len(uniq) else 1, dtype=np.int32)
+    for c in uniq:
+        v = norm(catalog.strings.items[c])
+        lut[c] = vocab.setdefault(v, len(vocab)) if v else 0
+    return lut[raw], vocab
+
+class ConstraintIndex:
+    def __init__(self, ids, catalog):
+        rows = catalog.rows(ids)
+        self.ids = list(ids)
+        # unknown values never exclude a trim: code 0 and NaN prices pass every filter
+        self.fuel, self.fuel_codes = _codes(catalog, catalog.fuel, rows, str.lower)
+        self.drive, self.drive_codes = _codes(catalog, catalog.drive, rows, norm_drive)
+        self.body, self.body_codes = _codes(catalog, catalog.body, rows, str.lower)
+        self.msrp = np.where(rows >= 0, catalog.msrp[np.maximum(rows, 0)], np.nan)
+
+    def _isin(self, col, codes, wanted):
+        want = [codes[w] for w in wanted if w in codes]
+        return np.isin(col, want) | (col == 0)
+
+    def feasible(self, prof, musts_ok=None):
+        """(n_rows,) bool of trims that pass every hard constraint in the profile."""
+        ok = np.ones(len(self.ids), dtype=bool) if musts_ok is None else musts_ok.copy()
+        fuels = {f.lower() for f in as_list(prof.get("powertrain_pref"))}
+        if fuels:
+            ok &= self._isin(self.fuel, self.fuel_codes, fuels)
+        drives = set()
+        for d in as_list(prof.get("drive_type")):
+            d = norm_drive(d)
+            drives |= DRIVE_ACCEPTS.get(d, {d})
+        if drives:
+            ok &= self._isin(self.drive, self.drive_codes, drives)
+        bodies = {b.lower() for b in as_list(prof.get("body_type"))}
+        if bodies:
+            ok &= self._isin(self.body, self.body_codes, bodies)
+        cap = max_price(prof.get("budget_total_usd"))
+        if cap is not None:
+            ok &= ~(self.msrp > cap)
+        return ok
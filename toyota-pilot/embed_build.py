@@ -1,40 +1,95 @@
 # embed_build.py
-import os, json, requests
+import os, json, time, argparse
+from concurrent.futures import ThreadPoolExecutor
+from llm_client import LLMClient, LLMError
+from vector_store import write_store, open_store, content_hash, store_paths
+from vector_index import build_ivf
 
-API_KEY = os.environ.get("OPENROUTER_API_KEY")
-if not API_KEY:
-    raise SystemExit("Set OPENROUTER_API_KEY first: export OPENROUTER_API_KEY='sk-or-...'")
-
-EMBED_URL = "https://openrouter.ai/api/v1/embeddings"
 MODEL = "openai/text-embedding-3-small"   # pick an embedding-capable model from your OpenRouter account
 
-docs = json.load(open("data/trim_docs.json"))
-out = {}
+def embed_docs(client, docs, batch_size=64, concurrency=4, model=MODEL):
+    """Embed [{"id", "doc"}] rows; returns ({id: vector}, stats)."""
+    batches = [docs[i:i + batch_size] for i in range(0, len(docs), batch_size)]
+    t0 = time.perf_counter()
+
+    def run(batch):
+        vecs, tokens = client.embed([row["doc"] for row in batch], model)
+        print(f"Embedded {len(batch)} docs ({batch[0]['id']} .. {batch[-1]['id']})")
+        return batch, vecs, tokens
 
-for row in docs:
-    text = row["doc"]
-    print("Embedding", row["id"])
-    payload = {
-        "model": MODEL,
-        "input": text
+    out, total_tokens = {}, 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for batch, vecs, tokens in pool.map(run, batches):
+            total_tokens += tokens
+            for row, vec in zip(batch, vecs):
+                out[row["id"]] = vec
+    elapsed = time.perf_counter() - t0
+    stats = {
+        "docs": len(docs),
+        "batches": len(batches),
+        "tokens": total_tokens,
+        "seconds": elapsed,
+        "docs_per_sec": len(docs) / elapsed if elapsed else 0.0,
+        "tokens_per_sec": total_tokens / elapsed if elapsed else 0.0,
     }
-    r = requests.post(
-        EMBED_URL,
-        headers={
-            "Authorization": f"Bearer {API_KEY}",
-            "Content-Type": "application/json"
-        },
-        json=payload
-    )
-    if r.status_code != 200:
-        print("Embedding failed:", r.status_code, r.text)
-        raise SystemExit("Embedding request failed")
-    data = r.json()
-    # OpenRouter uses OpenAI-like response format
-    embedding = data["data"][0]["embedding"]
-    out[row["id"]] = embedding
-
-with open("data/trim_vectors.json", "w") as f:
-    json.dump(out, f)
-
-print(f"✅ Wrote vectors for {len(out)} trims to data/trim_vectors.json")
+    return out, stats
+
+def load_previous(base, model):
+    """{content hash: vector} from an existing store, or {} if there is nothing reusable."""
+    if not os.path.exists(store_paths(base)[1]):
+        return {}
+    try:
+        ids, mat, header = open_store(base, model=model)
+    except ValueError as e:
+        print(f"Ignoring existing store: {e}")
+        return {}
+    hashes = header.get("hashes")
+    if not hashes:
+        return {}
+    return {h: mat[i] for i, h in enumerate(hashes)}
+
+def main():
+    ap = argparse.ArgumentParser(description="Embed data/trim_docs.json into the trim vector store")
+    ap.add_argument("--docs", default="data/trim_docs.json")
+    ap.add_argument("--out", default="data/trim_vectors")
+    ap.add_argument("--batch-size", type=int, default=64)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--max-retries", type=int, default=5)
+    ap.add_argument("--full", action="store_true", help="re-embed every doc, ignoring the existing store")
+    ap.add_argument("--ivf", action="store_true", help="also train the IVF index (kept in sync if one exists)")
+    args = ap.parse_args()
+
+    api_key = os.environ.get("OPENROUTER_API_KEY")
+    if not api_key:
+        raise SystemExit("Set OPENROUTER_API_KEY first: export OPENROUTER_API_KEY='sk-or-...'")
+
+    docs = json.load(open(args.docs))
+    hashes = {row["id"]: content_hash(row["doc"], MODEL) for row in docs}
+    # only new or changed docs go to the API; trims no longer in trim_docs.json are dropped
+    prev = {} if args.full else load_previous(args.out, MODEL)
+    todo = [row for row in docs if hashes[row["id"]] not in prev]
+    print(f"{len(docs) - len(todo)} unchanged, {len(todo)} to embed")
+
+    out, stats = {}, None
+    if todo:
+        client = LLMClient(api_key, max_concurrency=args.concurrency, max_retries=args.max_retries)
+        try:
+            out, stats = embed_docs(client, todo, batch_size=args.batch_size, concurrency=args.concurrency)
+        except LLMError as e:
+            raise SystemExit(f"Embedding failed: {e}")
+
+    ids = [row["id"] for row in docs]
+    vecs = [out[i] if i in out else prev[hashes[i]] for i in ids]
+    write_store(args.out, ids, vecs, MODEL, hashes=[hashes[i] for i in ids])
+
+    print(f"✅ Wrote vectors for {len(ids)} trims to {args.out}.npy")
+    if args.ivf or os.path.exists(args.out + ".ivf.npz"):
+        ix = build_ivf(args.out, model=MODEL)
+        print(f"✅ Wrote IVF index ({ix.nlist} lists) to {args.out}.ivf.npz")
+    if stats:
+        print(f"   {stats['batches']} batches in {stats['seconds']:.2f}s: "
+              f"{stats['docs_per_sec']:.1f} docs/sec, {stats['tokens_per_sec']:.0f} tokens/sec")
+        print(f"   latency: {client.metrics()['embeddings']}")
+
+if __name__ == "__main__":
+    main()
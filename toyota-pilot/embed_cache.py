@@ -0,0 +1,91 @@
+# embed_cache.py
+# Two-tier cache for query embeddings: an in-process LRU in front of a SQLite file,
+# keyed by (embedding model, whitespace-normalized text).
+import time, sqlite3, hashlib, threading, numpy as np
+from collections import OrderedDict
+
+def normalize_text(text):
+    return " ".join(text.split())
+
+def cache_key(model, text):
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+class EmbedCache:
+    def __init__(self, path, max_memory=1024, max_disk=50_000):
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, model TEXT NOT NULL, vec BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)")
+        self._db.commit()
+        self._disk_count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get(self, model, text):
+        key = cache_key(model, text)
+        with self._lock:
+            vec = self._mem.get(key)
+            if vec is not None:
+                self._mem.move_to_end(key)
+                self.hits_memory += 1
+                return vec
+            row = self._db.execute("SELECT vec FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE embeddings SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            vec = np.frombuffer(row[0], dtype=np.float32)
+            self._remember(key, vec)
+            self.hits_disk += 1
+            return vec
+
+    def put(self, model, text, vec):
+        key = cache_key(model, text)
+        vec = np.asarray(vec, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vec)
+            # overwriting a key doesn't grow the table
+            new = self._db.execute("SELECT 1 FROM embeddings WHERE key = ?", (key,)).fetchone() is None
+            self._db.execute(
+                "INSERT OR REPLACE INTO embeddings (key, model, vec, last_used) VALUES (?, ?, ?, ?)",
+                (key, model, vec.tobytes(), time.time()),
+            )
+            self._disk_count += new
+            if self._disk_count > self.max_disk:
+                # size-based eviction: drop the least recently used rows past max_disk
+                self._db.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    " SELECT key FROM embeddings ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk,),
+                )
+                self._disk_count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            self._db.commit()
+        return vec
+
+    def _remember(self, key, vec):
+        self._mem[key] = vec
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_memory:
+            self._mem.popitem(last=False)
+
+    def stats(self):
+        total = self.hits_memory + self.hits_disk + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": (self.hits_memory + self.hits_disk) / total if total else 0.0,
+            "memory_entries": len(self._mem),
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
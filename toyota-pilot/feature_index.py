@@ -0,0 +1,78 @@
+# feature_index.py
+# Bitset view of trim features. Every canonical feature key gets a bit; each trim row
+# stores a base-feature mask and an achievable-with-packages mask as uint64 words, so
+# must-have checks over the whole catalog are one AND/compare.
+import numpy as np
+
+WORD = 64
+
+class FeatureIndex:
+    def __init__(self, ids, catalog, ontology):
+        rows = catalog.rows(ids)
+        # ontology keys first, then anything the catalog uses that the ontology doesn't know
+        keys = sorted(set(ontology.values()))
+        keys += sorted(set(catalog.features.items[1:]) - set(keys))
+        self.keys = keys
+        self.bit = {k: i for i, k in enumerate(keys)}
+        self.words = max(1, -(-len(keys) // WORD))
+        self.ids = list(ids)
+        self.base = np.zeros((len(rows), self.words), dtype=np.uint64)
+        self.achievable = np.zeros((len(rows), self.words), dtype=np.uint64)
+        # catalog feature id -> bit, so rows are masked straight from the CSR index arrays
+        remap = np.array([self.bit.get(f, 0) for f in catalog.features.items], dtype=np.int64)
+        for i, r in enumerate(rows):
+            if r < 0:
+                continue
+            self.base[i] = self._bits_mask(remap[catalog.feature_ids(r)])
+            self.achievable[i] = self.base[i]
+            for p in catalog.package_range(r):
+                self.achievable[i] |= self._bits_mask(remap[catalog.package_adds(p)])
+
+    def _bits_mask(self, bits):
+        m = np.zeros(self.words, dtype=np.uint64)
+        np.bitwise_or.at(m, bits // WORD, np.left_shift(np.uint64(1), (bits % WORD).astype(np.uint64)))
+        return m
+
+    def mask(self, features):
+        """Bitmask words for a feature list; None if a feature is unknown to the catalog."""
+        m = np.zeros(self.words, dtype=np.uint64)
+        for f in features:
+            b = self.bit.get(f)
+            if b is None:
+                return None
+            m[b // WORD] |= np.uint64(1) << np.uint64(b % WORD)
+        return m
+
+    def available(self):
+        """Feature keys at least one trim has, standard or through a package."""
+        words = np.bitwise_or.reduce(self.achievable, axis=0) if len(self.ids) else np.zeros(self.words, dtype=np.uint64)
+        return {k for k, b in self.bit.items() if int(words[b // WORD]) >> (b % WORD) & 1}
+
+    def satisfies(self, musts):
+        """(n_rows,) bool: which trims can provide every must-have (base or via a package)."""
+        return self.satisfies_batch([musts])[0]
+
+    def satisfies_batch(self, musts_list):
+        """(n_profiles, n_rows) bool for a list of must-have lists."""
+        out = np.zeros((len(musts_list), len(self.ids)), dtype=bool)
+        for i, musts in enumerate(musts_list):
+            req = self.mask(musts)
+            if req is not None:
+                out[i] = ((self.achievable & req) == req).all(axis=1)
+        return out
+
+    def coverage(self, rows, features):
+        """(standard, achievable) bool matrices of shape (len(rows), len(features)).
+
+        Features unknown to the catalog are never covered."""
+        std = np.zeros((len(rows), len(features)), dtype=bool)
+        ach = np.zeros_like(std)
+        rows = np.asarray(rows, dtype=np.int64)
+        for j, f in enumerate(features):
+            b = self.bit.get(f)
+            if b is None:
+                continue
+            w, bit = b // WORD, np.uint64(1) << np.uint64(b % WORD)
+            std[:, j] = (self.base[rows, w] & bit) != 0
+            ach[:, j] = (self.achievable[rows, w] & bit) != 0
+        return std, ach
@@ -0,0 +1,163 @@
+# json_scan.py
+# Incremental JSON extractor for LLM output. One left-to-right pass over the text tracks
+# string/escape state and bracket depth, so ```json fences and prose around the answer
+# are skipped without regexes, chunks can be fed as they stream in, and the objects of
+# one top-level array (e.g. "top_5") are handed out the moment each one closes.
+import json
+from bisect import bisect_right
+
+class JSONExtractError(ValueError):
+    def __init__(self, msg, raw=""):
+        super().__init__(msg)
+        self.raw = raw
+
+class Fields:
+    """Object schema: required/optional key -> type, tuple of types, [item schema] or Fields.
+    With extra=False, keys outside required/optional are violations too."""
+    def __init__(self, required=None, optional=None, extra=True):
+        self.required = required or {}
+        self.optional = optional or {}
+        self.extra = extra
+
+def check(value, schema, path="$"):
+    """List of schema violations (empty when value fits)."""
+    if isinstance(schema, Fields):
+        if not isinstance(value, dict):
+            return [f"{path}: expected object, got {type(value).__name__}"]
+        errs = [f"{path}.{k}: missing" for k in schema.required if k not in value]
+        if not schema.extra:
+            errs += [f"{path}.{k}: unexpected key" for k in value
+                     if k not in schema.required and k not in schema.optional]
+        for k, sub in {**schema.optional, **schema.required}.items():
+            if k in value:
+                errs += check(value[k], sub, f"{path}.{k}")
+        return errs
+    if isinstance(schema, list):
+        if not isinstance(value, list):
+            return [f"{path}: expected array, got {type(value).__name__}"]
+        return [e for i, v in enumerate(value) for e in check(v, schema[0], f"{path}[{i}]")]
+    if not isinstance(value, schema):
+        return [f"{path}: unexpected {type(value).__name__}"]
+    return []
+
+class JSONScanner:
+    def __init__(self, item_key=None, item_schema=None):
+        self.item_key = item_key
+        self.item_schema = item_schema
+        # chunks are kept as received; joining them on every feed would make streaming quadratic
+        self.chunks = []
+        self.offsets = []
+        self.size = 0
+        self.depth = 0
+        self.in_str = False
+        self.esc = False
+        self.root_start = None
+        self.root_obj = False
+        self.str_start = None
+        self.last_str = None    # last complete string directly inside the root object
+        self.key = None         # key whose value is being read at depth 1
+        self.in_items = False
+        self.item_start = None
+        self.value = None
+        self.done = False
+
+    @property
+    def text(self):
+        return "".join(self.chunks)
+
+    def _slice(self, a, b):
+        k = bisect_right(self.offsets, a) - 1
+        parts = []
+        while k < len(self.chunks) and self.offsets[k] < b:
+            off = self.offsets[k]
+            parts.append(self.chunks[k][max(0, a - off):b - off])
+            k += 1
+        return "".join(parts)
+
+    def feed(self, chunk):
+        """Append a chunk; returns the item_key array entries completed by it."""
+        items = []
+        if self.done or not chunk:
+            return items
+        base = self.size
+        self.chunks.append(chunk)
+        self.offsets.append(base)
+        self.size += len(chunk)
+        for j, c in enumerate(chunk):
+            if self.done:
+                break
+            i = base + j
+            if self.in_str:
+                if self.esc:
+                    self.esc = False
+                elif c == "\\":
+                    self.esc = True
+                elif c == '"':
+                    self.in_str = False
+                    if self.depth == 1:
+                        self.last_str = self._slice(self.str_start, i + 1)
+            elif self.depth == 0:
+                # outside any candidate value: fences and prose, quotes included, are skipped
+                if c in "{[":
+                    self.root_start, self.root_obj, self.depth, self.key = i, c == "{", 1, None
+            elif c == '"':
+                self.in_str, self.str_start = True, i
+            elif c == ":" and self.depth == 1:
+                self.key = self._key()
+            elif c in "{[":
+                self.depth += 1
+                if self.depth == 2 and c == "[" and self.root_obj and self.key == self.item_key:
+                    self.in_items = True
+                elif self.depth == 3 and self.in_items:
+                    self.item_start = i
+            elif c in "}]":
+                self.depth -= 1
+                if self.depth == 2 and self.item_start is not None:
+                    item = self._item(self._slice(self.item_start, i + 1))
+                    if item is not None:
+                        items.append(item)
+                    self.item_start = None
+                elif self.depth == 1:
+                    self.in_items = False
+                elif self.depth == 0:
+                    self._close_root(self._slice(self.root_start, i + 1))
+        return items
+
+    def _key(self):
+        try:
+            return json.loads(self.last_str) if self.last_str else None
+        except ValueError:
+            return None
+
+    def _item(self, raw):
+        try:
+            item = json.loads(raw)
+        except ValueError:
+            return None
+        if self.item_schema is not None and check(item, self.item_schema):
+            return None
+        return item
+
+    def _close_root(self, raw):
+        try:
+            self.value = json.loads(raw)
+            self.done = True
+        except ValueError:
+            # balanced but not JSON (e.g. "{like this}" in prose): keep looking after it
+            self.root_start = None
+            self.in_items = False
+
+    def result(self, schema=None):
+        """The first complete JSON value, checked against schema; raises JSONExtractError."""
+        if not self.done:
+            raise JSONExtractError("no complete JSON value in output", self.text)
+        if schema is not None:
+            errs = check(self.value, schema)
+            if errs:
+                raise JSONExtractError("schema mismatch: " + "; ".join(errs[:5]), self.text)
+        return self.value
+
+def parse_json(text, schema=None):
+    scan = JSONScanner()
+    scan.feed(text)
+    return scan.result(schema)
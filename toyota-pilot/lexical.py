@@ -0,0 +1,91 @@
+# lexical.py
+# BM25 over trim_docs.json text plus each trim's canonical feature keys, row-aligned with
+# the vector index. Postings are CSR arrays with the BM25 term weight precomputed per
+# posting, so scoring a query is one bincount over the postings of its terms. fuse_rrf
+# merges the lexical and vector rankings (reciprocal-rank fusion needs no score scaling).
+import re, numpy as np
+
+TOKEN = re.compile(r"[a-z0-9]+")
+RRF_K = 60
+# on large catalogs, terms in more than half of the trims are skipped at query time: their
+# idf is below log(2) so they barely reorder anything, and their postings dominate the cost
+COMMON_DF = 0.5
+COMMON_MIN = 1000
+
+def tokenize(text):
+    return TOKEN.findall((text or "").lower())
+
+def key_terms(keys):
+    """A feature key is indexed whole ("heated_front_seats") and by its words."""
+    out = []
+    for k in keys:
+        k = k.lower()
+        out.append(k)
+        if "_" in k:
+            out += tokenize(k)
+    return out
+
+class BM25Index:
+    def __init__(self, ids, docs, k1=1.2, b=0.75):
+        """docs: one term list per id, in index row order."""
+        self.ids = list(ids)
+        self.vocab = {}
+        rows, terms = [], []
+        for r, doc in enumerate(docs):
+            for t in doc:
+                rows.append(r)
+                terms.append(self.vocab.setdefault(t, len(self.vocab)))
+        n = len(self.ids)
+        rows = np.array(rows, dtype=np.int64)
+        terms = np.array(terms, dtype=np.int64)
+        # one posting per (term, row) with its term frequency, grouped by term
+        pair = np.unique(terms * max(n, 1) + rows, return_counts=True)
+        keys, tf = pair
+        p_term, p_row = keys // max(n, 1), keys % max(n, 1)
+        dl = np.bincount(rows, minlength=n).astype(np.float32)
+        avgdl = dl.mean() if n and dl.mean() > 0 else 1.0
+        df = np.bincount(p_term, minlength=len(self.vocab))
+        idf = np.log(1 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        tf = tf.astype(np.float32)
+        norm = k1 * (1 - b + b * dl[p_row] / avgdl)
+        self.weight = idf[p_term] * tf * (k1 + 1) / (tf + norm)
+        self.row = p_row.astype(np.int32)
+        self.ptr = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        self.ptr[1:] = np.cumsum(df)
+        self.max_df = max(COMMON_MIN, int(COMMON_DF * n))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def scores(self, terms):
+        """(n_rows,) BM25 score of a query term list; unknown terms are ignored."""
+        spans = [(self.ptr[c], self.ptr[c + 1]) for c in map(self.vocab.get, set(terms))
+                 if c is not None and self.ptr[c + 1] - self.ptr[c] <= self.max_df]
+        if not spans:
+            return np.zeros(len(self.ids), dtype=np.float32)
+        sel = np.concatenate([np.arange(a, e) for a, e in spans])
+        return np.bincount(self.row[sel], weights=self.weight[sel], minlength=len(self.ids)).astype(np.float32)
+
+    def search(self, terms, k=10, mask=None):
+        """(rows, scores) of the k best matching rows with a positive score."""
+        return self.search_scores(self.scores(terms), k, mask)
+
+    def search_scores(self, s, k=10, mask=None):
+        """search() over an already computed score vector."""
+        if mask is not None:
+            s = np.where(mask, s, 0)
+        hits = np.flatnonzero(s > 0)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-s[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-s[hits], kind="stable")]
+        return hits, s[hits]
+
+def fuse_rrf(rankings, k=10, weights=None, c=RRF_K):
+    """Reciprocal-rank fusion of row rankings; returns (rows, fused scores), best first."""
+    weights = weights or [1.0] * len(rankings)
+    fused = {}
+    for ranking, w in zip(rankings, weights):
+        for rank, r in enumerate(ranking):
+            fused[int(r)] = fused.get(int(r), 0.0) + w / (c + rank + 1)
+    best = sorted(fused.items(), key=lambda kv: -kv[1])[:k]
+    return [r for r, _ in best], [s for _, s in best]
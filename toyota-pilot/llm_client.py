@@ -0,0 +1,165 @@
+# llm_client.py
+# Shared OpenRouter client for recommend.py and embed_build.py: one pooled keep-alive
+# session, per-call deadlines, jittered exponential retry on 429/5xx, a concurrency
+# limiter, and latency/error metrics. Async callers use achat/aembed, which run the
+# pooled sync call on a worker thread so both styles share one pool and one limiter.
+import os, json, time, random, asyncio, threading, requests
+from collections import deque
+from requests.adapters import HTTPAdapter
+
+# override OPENROUTER_BASE_URL to point at a local fake server
+BASE_URL = os.environ.get("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class LLMError(RuntimeError):
+    def __init__(self, msg, status=None):
+        super().__init__(msg)
+        self.status = status
+
+class _Stats:
+    def __init__(self, window=1000):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.latencies = deque(maxlen=window)
+
+    def summary(self):
+        lat = sorted(self.latencies)
+        pct = lambda p: lat[min(len(lat) - 1, int(p * len(lat)))] * 1000 if lat else 0.0
+        return {"calls": self.calls, "errors": self.errors, "retries": self.retries,
+                "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+
+class LLMClient:
+    def __init__(self, api_key, base_url=BASE_URL, max_concurrency=8, timeout=60,
+                 max_retries=4, backoff_base=0.5, backoff_max=8.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"})
+        self._limit = threading.BoundedSemaphore(max_concurrency)
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def _stat(self, endpoint):
+        with self._stats_lock:
+            return self._stats.setdefault(endpoint, _Stats())
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        # full jitter: uniform in [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _send(self, endpoint, payload, deadline=None, stream=False):
+        """POST JSON with retries and return the 200 response.
+
+        deadline is a total time budget in seconds across attempts. With stream=True the
+        body is left unread; only the attempts up to the response headers are retried.
+        """
+        stat = self._stat(endpoint)
+        end = time.monotonic() + deadline if deadline else None
+        url = f"{self.base_url}/{endpoint}"
+        for attempt in range(self.max_retries + 1):
+            timeout = self.timeout
+            if end is not None:
+                timeout = min(timeout, end - time.monotonic())
+                if timeout <= 0:
+                    break
+            t0 = time.monotonic()
+            retry_after = None
+            with self._limit:
+                try:
+                    r = self.session.post(url, json=payload, timeout=timeout, stream=stream)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    err, status = f"{type(e).__name__}: {e}", None
+                else:
+                    if r.status_code == 200:
+                        with self._stats_lock:
+                            stat.calls += 1
+                            stat.latencies.append(time.monotonic() - t0)
+                        return r
+                    err, status = f"HTTP {r.status_code}: {r.text[:300]}", r.status_code
+                    retry_after = r.headers.get("Retry-After")
+                    r.close()
+            with self._stats_lock:
+                stat.calls += 1
+                stat.errors += 1
+            if status is not None and status not in RETRY_STATUS:
+                raise LLMError(f"{endpoint} failed: {err}", status)
+            if attempt == self.max_retries:
+                raise LLMError(f"{endpoint} failed after {attempt + 1} attempts: {err}", status)
+            wait = self._backoff(attempt, retry_after)
+            if end is not None and time.monotonic() + wait >= end:
+                break
+            with self._stats_lock:
+                stat.retries += 1
+            time.sleep(wait)
+        raise LLMError(f"{endpoint} missed its {deadline}s deadline")
+
+    def post(self, endpoint, payload, deadline=None):
+        return self._send(endpoint, payload, deadline=deadline).json()
+
+    def _chat_payload(self, system, user, model, temperature):
+        return {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": user}
+            ],
+            "temperature": temperature
+        }
+
+    def chat(self, system, user, model, temperature=0.1, deadline=None):
+        payload = self._chat_payload(system, user, model, temperature)
+        return self.post("chat/completions", payload, deadline=deadline)["choices"][0]["message"]["content"]
+
+    def stream_chat(self, system, user, model, temperature=0.1, deadline=None):
+        """Yield content deltas of a streamed chat completion as they arrive (SSE).
+
+        The deadline covers getting the response started; after that each read is
+        bounded by the client timeout.
+        """
+        payload = dict(self._chat_payload(system, user, model, temperature), stream=True)
+        r = self._send("chat/completions", payload, deadline=deadline, stream=True)
+        try:
+            for line in r.iter_lines(decode_unicode=True):
+                # skip keep-alive comments such as ": OPENROUTER PROCESSING"
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or [{}]
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    yield delta
+        finally:
+            r.close()
+
+    def embed(self, inputs, model, deadline=None):
+        """Embed a list of texts; returns (vectors in input order, prompt tokens)."""
+        data = self.post("embeddings", {"model": model, "input": inputs}, deadline=deadline)
+        rows = sorted(data["data"], key=lambda d: d.get("index", 0))
+        if len(rows) != len(inputs):
+            raise LLMError(f"asked for {len(inputs)} embeddings, got {len(rows)}")
+        usage = data.get("usage") or {}
+        return [d["embedding"] for d in rows], usage.get("prompt_tokens") or usage.get("total_tokens") or 0
+
+    async def achat(self, *args, **kw):
+        return await asyncio.to_thread(self.chat, *args, **kw)
+
+    async def aembed(self, *args, **kw):
+        return await asyncio.to_thread(self.embed, *args, **kw)
+
+    def metrics(self):
+        with self._stats_lock:
+            return {ep: s.summary() for ep, s in self._stats.items()}
+
+    def close(self):
+        self.session.close()
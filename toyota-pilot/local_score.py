@@ -0,0 +1,129 @@
+# local_score.py
+# Deterministic finalize: fit_score, ranked top_5 and templated reasons computed from the
+# catalog columns for the candidate rows, in the same JSON shape FINAL_MODEL returns.
+# Every signal is a (k,) array in [0, 1]; signals that don't apply to the profile (no
+# must-haves, no budget, ...) drop out of the weighted average instead of scoring 0.
+import numpy as np
+from constraints import max_price
+
+WEIGHTS = {
+    "must_have": 0.30,
+    "nice_to_have": 0.10,
+    "options": 0.05,
+    "budget": 0.20,
+    "mpg": 0.10,
+    "style": 0.10,
+    "similarity": 0.15,
+}
+MPG_RANGE = (20.0, 55.0)   # combined mpg mapped linearly onto [0, 1]
+OPTIONS_SCALE = 2000.0     # package + paint cost at which the options signal halves
+TOP_N = 5
+MAX_REASONS = 4
+
+def label(key):
+    return key.replace("_", " ")
+
+def _labels(keys):
+    return ", ".join(label(k) for k in keys)
+
+def budget_signal(msrp, budget):
+    """1 at or under target, falling to 0.5 at the flex cap; unknown prices score 0.5."""
+    cap = max_price(budget)
+    if cap is None:
+        return None
+    target = budget["target"]
+    over = (msrp - target) / max(cap - target, 1.0)
+    s = np.where(msrp <= target, 1.0, 1.0 - 0.5 * np.clip(over, 0, 1))
+    return np.where(np.isnan(msrp), 0.5, s)
+
+def _fraction(hits):
+    return hits.mean(axis=1) if hits.shape[1] else None
+
+def score_candidates(snap, prof, candidates):
+    """(fit scores 0-100, per-candidate reasons) for candidate dicts from rank_profiles."""
+    cat, feats = snap.catalog, snap.features
+    rows = np.array([snap.index.pos[c["id"]] for c in candidates], dtype=np.int64)
+    crow = snap.rows[rows]
+    musts, nices = prof.get("must_have", []), prof.get("nice_to_have", [])
+    must_std, must_ach = feats.coverage(rows, musts)
+    nice_std, nice_ach = feats.coverage(rows, nices)
+    msrp = cat.msrp[crow].astype(np.float64)
+    # price as configured: msrp plus the packages and paint configure.py picked
+    configs = [c.get("configuration") or {} for c in candidates]
+    options = np.array([cf.get("package_cost_usd", 0) + cf.get("color_cost_usd", 0) for cf in configs], dtype=np.float64)
+    price = msrp + options
+    mpg = cat.mpg[crow, 2].astype(np.float64)
+    wanted = {s.lower() for s in prof.get("style_vibe", [])}
+    style_hits = [sorted(wanted & {s.lower() for s in cat.style_of(r)}) for r in crow]
+    sim = np.array([c.get("score_vector", 0.0) for c in candidates], dtype=np.float64)
+    spread = sim.max() - sim.min() if len(sim) else 0.0
+
+    signals = {
+        # a must-have that needs a package counts, but less than one that is standard
+        "must_have": _fraction(must_std + 0.7 * (must_ach & ~must_std)),
+        "nice_to_have": _fraction(nice_std + 0.5 * (nice_ach & ~nice_std)),
+        "options": 1.0 / (1.0 + options / OPTIONS_SCALE) if options.any() else None,
+        "budget": budget_signal(price, prof.get("budget_total_usd")),
+        "mpg": np.where(np.isnan(mpg), 0.5, np.clip((mpg - MPG_RANGE[0]) / (MPG_RANGE[1] - MPG_RANGE[0]), 0, 1)),
+        "style": np.array([len(h) / len(wanted) for h in style_hits]) if wanted else None,
+        "similarity": (sim - sim.min()) / spread if spread > 0 else np.ones_like(sim),
+    }
+    total = sum(WEIGHTS[k] * v for k, v in signals.items() if v is not None)
+    weight = sum(WEIGHTS[k] for k, v in signals.items() if v is not None)
+    fit = np.rint(100 * total / weight).astype(int)
+
+    reasons = []
+    for i, c in enumerate(candidates):
+        out = []
+        std = [m for j, m in enumerate(musts) if must_std[i, j]]
+        if std:
+            out.append(("Has all your must-haves: " if len(std) == len(musts) else "Standard: ") + _labels(std))
+        via = [m for j, m in enumerate(musts) if must_ach[i, j] and not must_std[i, j]]
+        if via:
+            pkgs = ", ".join(c.get("suggested_packages", [])) or "no listed package"
+            text = f"{_labels(via)} via {pkgs} (+${configs[i].get('package_cost_usd', 0):,})"
+            out.append(text[0].upper() + text[1:])
+        target = (prof.get("budget_total_usd") or {}).get("target") or 0
+        if target > 0 and not np.isnan(price[i]):
+            what = "As configured" if options[i] else "MSRP"
+            diff = int(price[i] - target)
+            if diff <= 0:
+                out.append(f"{what} ${int(price[i]):,}: ${-diff:,} under your ${target:,.0f} target")
+            elif configs[i].get("within_budget", True):
+                out.append(f"{what} ${int(price[i]):,}: ${diff:,} over target, within your flex")
+            else:
+                out.append(f"{what} ${int(price[i]):,}: ${diff:,} over target")
+        if not np.isnan(mpg[i]) and mpg[i] >= 30:
+            out.append(f"{int(mpg[i])} mpg combined")
+        if style_hits[i]:
+            out.append("Fits your " + ", ".join(style_hits[i]) + " style")
+        extra = [m for j, m in enumerate(nices) if nice_std[i, j]]
+        if extra:
+            out.append("Also has " + _labels(extra))
+        reasons.append(out[:MAX_REASONS])
+    return fit, reasons
+
+def _customizations(c):
+    config = c.get("configuration") or {}
+    out = list(config.get("packages", c.get("suggested_packages", [])))
+    if config.get("color_cost_usd") or config.get("color_matched"):
+        out.append(config["color"])
+    return out
+
+def finalize_local(snap, prof, candidates):
+    """FINAL_SCHEMA result for candidates without an LLM call."""
+    if not candidates:
+        return {"top_5": [], "others": []}
+    fit, reasons = score_candidates(snap, prof, candidates)
+    order = np.argsort(-fit, kind="stable")
+    top = [{
+        "id": candidates[i]["id"],
+        "model": candidates[i]["model"],
+        "year": candidates[i]["year"],
+        "trim": candidates[i]["trim"],
+        "fit_score": int(fit[i]),
+        "reasons": reasons[i],
+        "recommended_customizations": _customizations(candidates[i]),
+    } for i in order[:TOP_N]]
+    others = [{"id": candidates[i]["id"], "fit_score": int(fit[i])} for i in order[TOP_N:]]
+    return {"top_5": top, "others": others}
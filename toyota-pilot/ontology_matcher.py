@@ -0,0 +1,180 @@
+# ontology_matcher.py
+# Phrase matcher over feature_ontology.json, built once at startup. Text is normalized
+# to tokens (case, hyphens, punctuation, simple plurals), ontology phrases are found
+# inside longer text with a word-level Aho-Corasick automaton, and leftover short spans
+# get a bounded edit-distance lookup through a trigram index ("blindspot" -> "blind spot").
+import re
+from collections import deque
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+MAX_SPAN = 3   # tokens per fuzzy window
+
+def singular(tok):
+    if len(tok) > 3 and tok.endswith("s") and not tok.endswith(("ss", "us", "is")):
+        return tok[:-1]
+    return tok
+
+def normalize_tokens(text):
+    return [singular(t) for t in TOKEN_RE.findall(text.lower().replace("_", " "))]
+
+def levenshtein(a, b, bound):
+    """Edit distance, or bound + 1 as soon as it is known to exceed bound."""
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+        if min(cur) > bound:
+            return bound + 1
+        prev = cur
+    return prev[-1]
+
+def trigrams(word):
+    w = f"  {word} "
+    return {w[i:i + 3] for i in range(len(w) - 2)}
+
+class NGramIndex:
+    """Trigram index for bounded edit-distance lookup.
+
+    One edit destroys at most 3 trigrams, so a candidate within max_dist edits must
+    share at least |grams(query)| - 3 * max_dist of them; only those get a (bounded)
+    Levenshtein check.
+    """
+    def __init__(self, words=()):
+        self.words = []
+        self.postings = {}
+        for w in words:
+            self.add(w)
+
+    def add(self, word):
+        i = len(self.words)
+        self.words.append(word)
+        for g in trigrams(word):
+            self.postings.setdefault(g, []).append(i)
+
+    def search(self, word, max_dist):
+        """(distance, word) pairs within max_dist, closest first."""
+        grams = trigrams(word)
+        need = len(grams) - 3 * max_dist
+        counts = {}
+        for g in grams:
+            for i in self.postings.get(g, ()):
+                counts[i] = counts.get(i, 0) + 1
+        out = []
+        for i, c in counts.items():
+            if c < need:
+                continue
+            d = levenshtein(word, self.words[i], max_dist)
+            if d <= max_dist:
+                out.append((d, self.words[i]))
+        return sorted(out)
+
+class OntologyMatcher:
+    def __init__(self, ontology):
+        # normalized phrase -> canonical key; canonical keys also match themselves
+        self.phrases = {}
+        for phrase, key in ontology.items():
+            self.phrases.setdefault(" ".join(normalize_tokens(phrase)), key)
+        for key in set(ontology.values()):
+            self.phrases.setdefault(" ".join(normalize_tokens(key)), key)
+        self.phrases.pop("", None)
+        self._build_automaton()
+        self.fuzzy_index = NGramIndex(p for p in self.phrases if len(p) >= 4)
+
+    def _build_automaton(self):
+        # word-level Aho-Corasick: goto[state][token], fail[state], out[state] = phrase lengths
+        self.goto, self.fail, self.out = [{}], [0], [[]]
+        for phrase in self.phrases:
+            s = 0
+            toks = phrase.split()
+            for t in toks:
+                if t not in self.goto[s]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[s][t] = len(self.goto) - 1
+                s = self.goto[s][t]
+            self.out[s].append(len(toks))
+        q = deque(self.goto[0].values())
+        while q:
+            s = q.popleft()
+            for t, nxt in self.goto[s].items():
+                q.append(nxt)
+                f = self.fail[s]
+                while f and t not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(t, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def _exact_spans(self, toks):
+        spans = []
+        s = 0
+        for i, t in enumerate(toks):
+            while s and t not in self.goto[s]:
+                s = self.fail[s]
+            s = self.goto[s].get(t, 0)
+            for n in self.out[s]:
+                spans.append((i - n + 1, i + 1))
+        return spans
+
+    def _fuzzy(self, phrase):
+        if len(phrase) < 4:
+            return None
+        max_dist = 1 if len(phrase) <= 8 else 2
+        for d, cand in self.fuzzy_index.search(phrase, max_dist):
+            # typos rarely hit the first letter; this keeps "weather" away from "leather"
+            if cand[0] == phrase[0]:
+                return cand
+        return None
+
+    def find(self, text, fuzzy=True):
+        """Non-overlapping (start, end, key) token spans of ontology phrases in text.
+
+        Returns (matches, tokens); longest match wins, leftmost on ties.
+        """
+        toks = normalize_tokens(text)
+        spans = self._exact_spans(toks)
+        if fuzzy:
+            covered = set()
+            for a, b in spans:
+                covered.update(range(a, b))
+            for n in range(MAX_SPAN, 0, -1):
+                for a in range(len(toks) - n + 1):
+                    if covered.intersection(range(a, a + n)):
+                        continue
+                    cand = self._fuzzy(" ".join(toks[a:a + n]))
+                    if cand:
+                        spans.append((a, a + n, cand))
+                        covered.update(range(a, a + n))
+        chosen, taken = [], set()
+        for span in sorted(spans, key=lambda s: (-(s[1] - s[0]), s[0])):
+            a, b = span[0], span[1]
+            if taken.intersection(range(a, b)):
+                continue
+            taken.update(range(a, b))
+            key = self.phrases[span[2] if len(span) == 3 else " ".join(toks[a:b])]
+            chosen.append((a, b, key))
+        return sorted(chosen), toks
+
+    def lookup(self, phrase):
+        """Canonical key for a short phrase (exact, then fuzzy), or None."""
+        norm = " ".join(normalize_tokens(phrase))
+        key = self.phrases.get(norm)
+        if key:
+            return key
+        cand = self._fuzzy(norm) or self._fuzzy(norm.replace(" ", ""))
+        if cand:
+            return self.phrases[cand]
+        matches, _ = self.find(phrase, fuzzy=False)
+        return matches[0][2] if len(matches) == 1 else None
+
+    def keys_in(self, text):
+        """(canonical keys found in text, leftover tokens joined)."""
+        matches, toks = self.find(text)
+        used = set()
+        for a, b, _ in matches:
+            used.update(range(a, b))
+        rest = " ".join(t for i, t in enumerate(toks) if i not in used)
+        return [k for _, _, k in matches], rest
@@ -0,0 +1,164 @@
+# quantize.py
+# Compressed trim vectors for the flat index: int8 scalar quantization (per-dimension
+# scale, ~4x smaller) and product quantization (m uint8 codes per row, ~6*dim/m x
+# smaller) scored with asymmetric distance (float query vs. coded rows). Both can be
+# stacked on Matryoshka truncation (VECTOR_DIMS). Codes are saved next to the store as
+# <base>.<mode>[_d<dims>].npz and tied to the store rows like the IVF index.
+import os, sys, json, argparse, numpy as np
+from vector_store import open_store
+from vector_index import VectorIndex, l2_normalize, truncate, store_digest
+
+QUANT_VERSION = 1
+QUANT_MODES = ("int8", "pq")
+CHUNK = 16384
+
+class Int8Index(VectorIndex):
+    def __init__(self, ids, mat=None, model=None, dims=None, codes=None, scale=None):
+        self._init_rows(ids, model, dims)
+        if codes is None:
+            X = l2_normalize(truncate(mat, dims))
+            scale = np.abs(X).max(axis=0) / 127
+            scale[scale == 0] = 1.0
+            codes = np.round(X / scale).astype(np.int8)
+        self.codes = np.asarray(codes, dtype=np.int8)
+        self.scale = np.asarray(scale, dtype=np.float32)
+
+    @property
+    def dim(self):
+        return self.codes.shape[1]
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.scale.nbytes
+
+    def params(self):
+        return {"codes": self.codes, "scale": self.scale}
+
+    def score_rows(self, qn, rows=None):
+        # fold the per-dimension scale into the query once, then dot against raw codes
+        codes = self.codes if rows is None else self.codes[rows]
+        qs = qn * self.scale
+        out = np.empty(len(codes), dtype=np.float32)
+        for i in range(0, len(codes), CHUNK):
+            out[i:i + CHUNK] = codes[i:i + CHUNK].astype(np.float32) @ qs
+        return out
+
+    def score_batch(self, Qn):
+        Qs = (Qn * self.scale).T
+        out = np.empty((len(Qn), len(self.codes)), dtype=np.float32)
+        for i in range(0, len(self.codes), CHUNK):
+            out[:, i:i + CHUNK] = (self.codes[i:i + CHUNK].astype(np.float32) @ Qs).T
+        return out
+
+def kmeans_l2(X, k, n_iter=15, seed=0):
+    rng = np.random.default_rng(seed)
+    C = X[rng.choice(len(X), size=k, replace=len(X) < k)].copy()
+    for _ in range(n_iter):
+        # argmin ||x - c||^2 == argmax (x.c - ||c||^2 / 2)
+        assign = np.argmax(X @ C.T - 0.5 * (C * C).sum(axis=1), axis=1)
+        counts = np.bincount(assign, minlength=k)
+        sums = np.zeros_like(C)
+        np.add.at(sums, assign, X)
+        filled = counts > 0
+        C[filled] = sums[filled] / counts[filled, None]
+        empty = np.flatnonzero(~filled)
+        C[empty] = X[rng.choice(len(X), size=len(empty))]
+    return C
+
+class PQIndex(VectorIndex):
+    def __init__(self, ids, mat=None, model=None, dims=None, m=64, ksub=256, codebooks=None, codes=None,
+                 train_size=20_000, seed=0):
+        self._init_rows(ids, model, dims)
+        if codebooks is None:
+            X = l2_normalize(truncate(mat, dims))
+            if X.shape[1] % m:
+                raise ValueError(f"PQ needs dim ({X.shape[1]}) divisible by m ({m})")
+            ksub = min(ksub, len(X))
+            rng = np.random.default_rng(seed)
+            train = X[rng.choice(len(X), size=min(train_size, len(X)), replace=False)]
+            dsub = X.shape[1] // m
+            codebooks = np.stack([kmeans_l2(train[:, j * dsub:(j + 1) * dsub], ksub, seed=seed + j)
+                                  for j in range(m)])
+            codes = np.empty((len(X), m), dtype=np.uint8)
+            for j in range(m):
+                C = codebooks[j]
+                sub = X[:, j * dsub:(j + 1) * dsub]
+                for i in range(0, len(X), CHUNK):
+                    codes[i:i + CHUNK, j] = np.argmax(sub[i:i + CHUNK] @ C.T - 0.5 * (C * C).sum(axis=1), axis=1)
+        self.codebooks = np.asarray(codebooks, dtype=np.float32)   # (m, ksub, dsub)
+        self.codes = np.asarray(codes, dtype=np.uint8)             # (n, m)
+        self.m = self.codebooks.shape[0]
+        self._cols = np.arange(self.m)
+
+    @property
+    def dim(self):
+        return self.codebooks.shape[0] * self.codebooks.shape[2]
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.codebooks.nbytes
+
+    def params(self):
+        return {"codebooks": self.codebooks, "codes": self.codes}
+
+    def _lut(self, qn):
+        # asymmetric distance: (m, ksub) table of query-subvector . centroid
+        return np.einsum("jd,jkd->jk", qn.reshape(self.m, -1), self.codebooks)
+
+    def score_rows(self, qn, rows=None):
+        codes = self.codes if rows is None else self.codes[rows]
+        lut = self._lut(qn)
+        out = np.zeros(len(codes), dtype=np.float32)
+        for j in range(self.m):
+            out += lut[j, codes[:, j]]
+        return out
+
+    def score_batch(self, Qn):
+        return np.stack([self.score_rows(qn) for qn in Qn])
+
+def quant_path(base, mode, dims=None):
+    return f"{base}.{mode}" + (f"_d{dims}" if dims else "") + ".npz"
+
+def build_quantized(ids, mat, mode, model=None, dims=None, **kw):
+    if mode == "int8":
+        return Int8Index(ids, mat, model=model, dims=dims)
+    if mode == "pq":
+        return PQIndex(ids, mat, model=model, dims=dims, **kw)
+    raise ValueError(f"unknown quantization {mode!r}, expected one of {QUANT_MODES}")
+
+def save_quantized(index, base, header):
+    mode = "int8" if isinstance(index, Int8Index) else "pq"
+    path = quant_path(base, mode, index.dims)
+    meta = {"version": QUANT_VERSION, "mode": mode, "dims": index.dims, "store": store_digest(header)}
+    with open(path + ".tmp", "wb") as f:
+        np.savez(f, meta=np.array(json.dumps(meta)), **index.params())
+    os.replace(path + ".tmp", path)
+    return path
+
+def open_quantized(base, model=None, mode="int8", dims=None, **kw):
+    """Load saved codes if they match the store, otherwise quantize the store in memory."""
+    ids, mat, header = open_store(base, model=model)
+    path = quant_path(base, mode, dims)
+    if os.path.exists(path):
+        with np.load(path) as z:
+            meta = json.loads(str(z["meta"]))
+            if meta.get("version") == QUANT_VERSION and meta.get("store") == store_digest(header):
+                cls = Int8Index if mode == "int8" else PQIndex
+                return cls(ids, model=header["model"], dims=dims,
+                           **{k: z[k] for k in z.files if k != "meta"})
+    return build_quantized(ids, mat, mode, model=header["model"], dims=dims, **kw)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Quantize the trim vector store")
+    ap.add_argument("--store", default="data/trim_vectors")
+    ap.add_argument("--mode", default="int8", choices=QUANT_MODES)
+    ap.add_argument("--dims", type=int, default=None, help="Matryoshka truncation, e.g. 256 or 512")
+    ap.add_argument("--m", type=int, default=64, help="PQ subquantizers")
+    args = ap.parse_args()
+    if not os.path.exists(args.store + ".npy"):
+        sys.exit(f"{args.store}.npy not found")
+    ids, mat, header = open_store(args.store)
+    kw = {"m": args.m} if args.mode == "pq" else {}
+    ix = build_quantized(ids, mat, args.mode, model=header["model"], dims=args.dims, **kw)
+    path = save_quantized(ix, args.store, header)
+    print(f"✅ Wrote {args.mode} codes ({ix.nbytes / 1024:.1f} KiB vs {mat.nbytes / 1024:.1f} KiB float) to {path}")
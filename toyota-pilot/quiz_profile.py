@@ -0,0 +1,265 @@
+# quiz_profile.py
+# Rule-based preference extractor for the quiz. Every State.get_quiz_data option and MSRP
+# bucket maps straight to EXTRACT_USER_TMPL fields, and custom answers are matched
+# against the feature ontology (ontology_matcher.py) plus small keyword tables. Only
+# custom text that still has unknown words left over is worth a PARSER_MODEL call.
+import re
+
+# question key -> EXTRACT_USER_TMPL field the answer describes
+QUIZ_FIELDS = {
+    "question_1": "location",
+    "question_2": "purpose",
+    "question_3": "appearance",
+    "question_4": "features",
+    "question_5": "budget",
+}
+
+# question -> option head (label text before " – ", emoji stripped) -> profile fields it implies
+QUESTION_RULES = {
+    "question_1": {  # roads and conditions
+        "City streets / stop-and-go traffic": {"location_tags": ["city", "stop_and_go"]},
+        "Highways / long-distance": {"location_tags": ["highway", "long_distance"]},
+        "Heavy rain or storms": {"location_tags": ["heavy_rain"]},
+        "Rough terrain / off-road": {"location_tags": ["off_road"], "drive_type": ["AWD"]},
+        "Snowy or icy roads": {"location_tags": ["snow_ice"], "drive_type": ["AWD"]},
+    },
+    "question_2": {  # usage
+        "Daily commuting": {"purpose": ["commuting"]},
+        "Weekend getaways or road trips": {"purpose": ["road_trips"]},
+        "Family activities and errands": {"purpose": ["family"]},
+        "Outdoor or hobby trips": {"purpose": ["outdoor"]},
+        "Business or delivery use": {"purpose": ["business"]},
+    },
+    "question_3": {  # vehicle type
+        "Compact & modern": {"style_vibe": ["compact", "modern", "sleek"], "body_type": ["Sedan", "Hatchback"]},
+        "SUV & adventurous": {"style_vibe": ["adventurous", "practical"], "body_type": ["SUV"]},
+        "Sedan & elegant": {"style_vibe": ["elegant", "refined", "comfortable"], "body_type": ["Sedan"]},
+        "Truck & bold": {"style_vibe": ["bold", "capable", "outdoorsy"], "body_type": ["Truck"]},
+        "Minivan & family-focused": {"style_vibe": ["family", "roomy"], "body_type": ["Minivan"]},
+    },
+    "question_4": {  # feature checkboxes -> catalog feature keys
+        "Heated front seats": {"must_have": ["heated_front_seats"]},
+        "Blind spot monitor": {"must_have": ["blind_spot_monitor"]},
+        "Panoramic roof": {"must_have": ["panoramic_roof"]},
+        "Wireless Apple CarPlay": {"must_have": ["wireless_carplay"]},
+        "Adaptive cruise control": {"must_have": ["adaptive_cruise"]},
+        "Ventilated front seats": {"must_have": ["ventilated_front_seats"]},
+        "Leather or premium seating": {"must_have": ["leather_seats"]},
+        "Power liftgate": {"must_have": ["power_liftgate"]},
+    },
+}
+OPTION_RULES = {head: rule for rules in QUESTION_RULES.values() for head, rule in rules.items()}
+MAX_FEATURES = 2   # State._toggle_feature allows at most two feature checkboxes
+
+# MSRP bucket -> (low, high); None = open-ended
+MSRP_BUCKETS = {
+    "Under $25,000": (0, 25000),
+    "$25,000 - $35,000": (25000, 35000),
+    "$35,000 - $45,000": (35000, 45000),
+    "$45,000 - $55,000": (45000, 55000),
+    "Over $55,000": (55000, None),
+    "Doesn't matter / No preference": (None, None),
+}
+
+# keywords for custom text that the feature ontology doesn't cover
+KEYWORDS = {
+    "location_tags": {
+        "city": "city", "downtown": "city", "traffic": "stop_and_go", "highway": "highway",
+        "freeway": "highway", "commute": "highway", "rain": "heavy_rain", "storm": "heavy_rain",
+        "snow": "snow_ice", "ice": "snow_ice", "icy": "snow_ice", "mountain": "mountains",
+        "dirt": "off_road", "gravel": "off_road", "offroad": "off_road", "trail": "off_road",
+        "suburb": "suburbs", "suburbs": "suburbs", "rural": "rural",
+    },
+    "purpose": {
+        "commute": "commuting", "commuting": "commuting", "work": "commuting", "family": "family",
+        "kids": "family", "school": "family", "trip": "road_trips", "trips": "road_trips",
+        "camping": "outdoor", "hiking": "outdoor", "fishing": "outdoor", "towing": "towing",
+        "tow": "towing", "delivery": "business", "business": "business",
+    },
+    "style_vibe": {
+        "sleek": "sleek", "modern": "modern", "sporty": "sporty", "elegant": "elegant",
+        "luxury": "luxury", "luxurious": "luxury", "bold": "bold", "rugged": "rugged",
+        "compact": "compact", "roomy": "roomy", "spacious": "roomy", "classic": "classic",
+    },
+    "body_type": {
+        "suv": "SUV", "crossover": "SUV", "sedan": "Sedan", "truck": "Truck", "pickup": "Truck",
+        "minivan": "Minivan", "van": "Minivan", "hatchback": "Hatchback",
+    },
+    "powertrain_pref": {
+        "hybrid": "hybrid", "plug": "phev", "phev": "phev", "electric": "ev", "ev": "ev",
+        "gas": "gas", "gasoline": "gas",
+    },
+}
+
+STOPWORDS = set("""
+a an and or the of to for in on at by with without from my our me we i it its is are be
+been am was were that this these those some any more most less very really just also
+mostly usually often sometimes lots lot bit kind sort like want need would prefer love
+good nice great something thing things around about maybe please car vehicle one
+budget price
+""".split())
+
+BUDGET_RE = re.compile(r"(\$)?\s*(\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)\s*(k|thousand)?\b", re.IGNORECASE)
+BUDGET_CUE_RE = re.compile(r"\b(?:budget|price)", re.IGNORECASE)
+# an answer that rules something out ("no third row", "don't need AWD") would read as a
+# request word by word; those go to the parser LLM whole
+NEGATION_RE = re.compile(r"\b(?:no|not|never|without|avoid\w*|don'?t|doesn'?t|won'?t|can'?t)\b", re.IGNORECASE)
+WORD_RE = re.compile(r"[a-z0-9]+")
+OFFROAD_RE = re.compile(r"\boff[\s-]+road", re.IGNORECASE)
+
+def option_head(label):
+    # "🚙 SUV & adventurous – practical ..." -> "SUV & adventurous"
+    head = label.split(" – ")[0]
+    return re.sub(r"^[^\w$]+", "", head).strip()
+
+def budget_from_bucket(label):
+    lo, hi = MSRP_BUCKETS.get(label, (None, None))
+    if not hi:
+        return {"target": 0, "flex_pct": 10}
+    # target the middle of the bucket with enough flex to reach its top
+    target = (lo + hi) / 2 if lo else hi
+    return {"target": int(target), "flex_pct": round((hi - target) / target * 100, 1)}
+
+def budget_from_text(text):
+    """(budget, bare) for price-sized amounts in text. Only an amount with a `$`, "k"/"thousand"
+    or a "budget"/"price" just before it is a budget (the first one wins); the rest ("a 7,000 lb
+    camper") are returned in bare and left to the parser LLM."""
+    budget, bare = None, []
+    for m in BUDGET_RE.finditer(text):
+        val = float(m.group(2).replace(",", ""))
+        if m.group(3):
+            val *= 1000
+        if not 5000 <= val <= 500000:
+            continue
+        if m.group(1) or m.group(3) or BUDGET_CUE_RE.search(text[max(0, m.start() - 30):m.start()]):
+            budget = budget or {"target": int(val), "flex_pct": 10}
+        else:
+            bare.append(m.group(0).strip())
+    return budget, bare
+
+def selected(quiz, q):
+    return (quiz.get(q) or {}).get("selected_options", [])
+
+def custom_answers(quiz):
+    """{template field: text} for non-empty custom answers."""
+    out = {}
+    for q, field in QUIZ_FIELDS.items():
+        text = ((quiz.get(q) or {}).get("custom_answer") or "").strip()
+        if text:
+            out[field] = text
+    return out
+
+def empty_profile():
+    return {
+        "purpose": [],
+        "location_tags": [],
+        "style_vibe": [],
+        "must_have": [],
+        "nice_to_have": [],
+        "powertrain_pref": "no-strong-preference",
+        "drive_type": [],
+        "body_type": [],
+        "budget_total_usd": {"target": 0, "flex_pct": 10},
+        "notes": "",
+    }
+
+def soften_must_haves(prof, available):
+    """Must-haves no trim can provide become nice-to-haves, so a feature the catalog
+    doesn't list (e.g. power_liftgate) ranks trims instead of filtering out all of them."""
+    musts = prof.get("must_have", [])
+    soft = [f for f in musts if f not in available]
+    if not soft:
+        return prof
+    out = dict(prof)
+    out["must_have"] = [f for f in musts if f in available]
+    out["nice_to_have"] = sorted(set(prof.get("nice_to_have", [])) | set(soft))
+    return out
+
+class QuizExtractor:
+    """Built once per ontology matcher; extract() maps a quiz dict to (profile, unknown custom text).
+    With `available` (FeatureIndex.available()), must-haves outside it are softened."""
+
+    def __init__(self, matcher, available=None):
+        self.matcher = matcher
+        self.available = available
+        self.rules = {head.lower(): rule for head, rule in OPTION_RULES.items()}
+
+    def match_custom(self, field, text):
+        """Profile fields found in one custom answer, plus the words nothing recognized. A
+        negated answer is left unrecognized as a whole."""
+        found = empty_profile()
+        if NEGATION_RE.search(text.replace("\u2019", "'")):
+            return found, text
+        # amounts first, before normalization splits "$42,000" apart
+        budget, bare = budget_from_text(text)
+        if budget:
+            found["budget_total_usd"] = budget
+        text = BUDGET_RE.sub(" ", text)
+        text = OFFROAD_RE.sub("offroad", text)
+        feats, rest = self.matcher.keys_in(text)
+        # features typed under "features" are asked for; elsewhere they are a bonus
+        found["must_have" if field == "features" else "nice_to_have"] = feats
+        drives = [k for k in feats if k in ("AWD", "4WD", "FWD", "RWD")]
+        if drives:
+            found["drive_type"] = drives
+            found["must_have"] = [k for k in found["must_have"] if k not in drives]
+            found["nice_to_have"] = [k for k in found["nice_to_have"] if k not in drives]
+        unknown = bare
+        for w in WORD_RE.findall(rest):
+            hit = False
+            for key, table in KEYWORDS.items():
+                val = table.get(w) or table.get(w.rstrip("s"))
+                if val:
+                    if key == "powertrain_pref":
+                        # first mention wins: "plug-in hybrid" is a phev
+                        if found[key] == "no-strong-preference":
+                            found[key] = val
+                    else:
+                        found[key].append(val)
+                    hit = True
+            if not hit and w not in STOPWORDS and not w.isdigit():
+                unknown.append(w)
+        return found, " ".join(unknown)
+
+    def extract(self, quiz):
+        prof = empty_profile()
+        for q in ("question_1", "question_2", "question_3", "question_4"):
+            for label in selected(quiz, q):
+                for key, vals in self.rules.get(option_head(label).lower(), {}).items():
+                    prof[key] = prof[key] + vals
+        for label in selected(quiz, "question_5"):
+            prof["budget_total_usd"] = budget_from_bucket(label)
+        unknown = {}
+        for field, text in custom_answers(quiz).items():
+            found, rest = self.match_custom(field, text)
+            prof = merge_profiles(prof, found)
+            if rest:
+                unknown[field] = text
+        for key in ("purpose", "location_tags", "style_vibe", "must_have", "nice_to_have", "drive_type", "body_type"):
+            prof[key] = sorted(set(prof[key]))
+        if self.available is not None:
+            prof = soften_must_haves(prof, self.available)
+        return prof, unknown
+
+def merge_profiles(base, extra, budget_from_extra=False):
+    """Union list fields; scalar fields from extra only fill what base left open. With
+    budget_from_extra (extra is the parser LLM's reading of the custom text), a budget in
+    extra replaces the rule-derived one."""
+    out = dict(base)
+    for key, val in (extra or {}).items():
+        cur = out.get(key)
+        if isinstance(val, list) or (key in ("drive_type", "body_type") and isinstance(cur, list)):
+            vals = [val] if isinstance(val, str) else val
+            out[key] = sorted(set(cur or []) | set(v for v in vals if v))
+        elif key == "budget_total_usd":
+            if isinstance(val, dict) and val.get("target") and (
+                    budget_from_extra or not (cur or {}).get("target")):
+                out[key] = val
+        elif key == "powertrain_pref":
+            if val and cur in (None, "", "no-strong-preference"):
+                out[key] = val
+        elif key == "notes":
+            out[key] = " ".join(x for x in (cur, val) if x)
+        elif val and not cur:
+            out[key] = val
+    return out
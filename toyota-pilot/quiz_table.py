@@ -0,0 +1,101 @@
+# quiz_table.py
+# Precomputed answers for quizzes whose custom text (if any) is fully recognized. Such a
+# quiz maps deterministically to a profile (quiz_profile.py), and that profile plus the
+# data files fix the candidate list, so build_quiz_table.py computes them offline and
+# the engine serves them with one primary-key lookup. Rows are keyed by the canonical
+# profile and k, and carry the data version they were built from; rows built from other
+# data files are never returned. Bodies are zlib-compressed JSON.
+import os, json, zlib, sqlite3, hashlib, threading
+from response_cache import _canonical
+
+SOURCE_FILES = ("vehicles.json", "feature_ontology.json", "trim_docs.json", "trim_vectors.meta.json")
+
+def data_version(data_dir, settings):
+    """Hash of the data files and ranking settings a candidate list depends on."""
+    h = hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    for name in SOURCE_FILES:
+        path = os.path.join(data_dir, name)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                h.update(name.encode("utf-8") + b"\0" + f.read())
+    return h.hexdigest()[:16]
+
+def quiz_key(profile, k):
+    blob = json.dumps({"profile": _canonical(profile), "k": k}, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def read_submissions(path):
+    """Rows of a quiz_response.json file (one submission or a list) or a quiz_store JSONL
+    log, oldest first. A row is the quiz itself or a log record with it under "quiz"."""
+    with open(path, encoding="utf-8") as f:
+        if not path.endswith(".jsonl"):
+            rows = json.load(f)
+            return rows if isinstance(rows, list) else [rows]
+        rows = []
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                continue  # blank, or torn by a crash mid-write
+        return rows
+
+def _pack(obj):
+    return None if obj is None else zlib.compress(json.dumps(obj, ensure_ascii=False).encode("utf-8"), 6)
+
+def _unpack(blob):
+    return None if blob is None else json.loads(zlib.decompress(blob))
+
+class QuizTable:
+    def __init__(self, path):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " key TEXT PRIMARY KEY, version TEXT NOT NULL, candidates BLOB NOT NULL,"
+            " result BLOB, mode TEXT)"
+        )
+        self._db.commit()
+
+    def get(self, key, version):
+        """(candidates, result, finalize mode) or None; result is None when not precomputed."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT candidates, result, mode FROM answers WHERE key = ? AND version = ?", (key, version)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return _unpack(row[0]), _unpack(row[1]), row[2]
+
+    def put_many(self, version, rows):
+        """rows: (key, candidates, result or None, finalize mode or None)."""
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO answers (key, version, candidates, result, mode) VALUES (?, ?, ?, ?, ?)",
+                [(key, version, _pack(cands), _pack(result), mode) for key, cands, result, mode in rows],
+            )
+            self._db.commit()
+
+    def purge(self, version):
+        """Drop rows built from other data; returns how many were removed."""
+        with self._lock:
+            n = self._db.execute("DELETE FROM answers WHERE version != ?", (version,)).rowcount
+            self._db.commit()
+        return n
+
+    def keys(self, version):
+        with self._lock:
+            return {r[0] for r in self._db.execute("SELECT key FROM answers WHERE version = ?", (version,))}
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            rows = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        return {"rows": rows, "hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
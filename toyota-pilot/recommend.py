@@ -1,64 +1,56 @@
 # recommend.py
-import os, json, re, numpy as np, requests
-
-def to_json(s: str):
-    s = s.strip()
-    # remove ```json ... ``` fences if present
-    s = re.sub(r"^```(?:json)?\s*|\s*```$", "", s, flags=re.IGNORECASE | re.MULTILINE)
-    s = s.strip()
-    # if extra text still surrounds the JSON, grab the first {...} or [...]
-    if not (s.startswith("{") or s.startswith("[")):
-        m = re.search(r"(\{.*\}|\[.*\])", s, flags=re.DOTALL)
-        if m:
-            s = m.group(1)
-    return json.loads(s)
-
-
-from sklearn.metrics.pairwise import cosine_similarity
+# Quiz/free-text -> grounded Toyota recommendations. Nothing runs at import: a
+# RecommendationEngine loads the catalog, ontology and vector index once and then serves
+# any number of requests (see serve.py for the HTTP endpoint). get_engine() returns a
+# shared per-process instance for callers such as the Reflex frontend.
+#
+# Everything derived from the data files lives in an immutable CatalogSnapshot. A watcher
+# thread polls the files, builds a new snapshot in the background when they change and
+# swaps engine.snapshot in one assignment; each request reads the reference once, so
+# in-flight requests finish on the snapshot they started with.
+import os, sys, glob, json, time, asyncio, threading, numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from vector_index import open_index, l2_normalize
+from embed_cache import EmbedCache
+from response_cache import ResponseCache, catalog_version
+from catalog import load_catalog
+from feature_index import FeatureIndex
+from constraints import ConstraintIndex, as_list
+from lexical import BM25Index, tokenize, key_terms, fuse_rrf
+from local_score import finalize_local
+from configure import Configurator
+from quiz_table import QuizTable, data_version, quiz_key, read_submissions
+from llm_client import LLMClient
+from quiz_profile import QUIZ_FIELDS, QuizExtractor, merge_profiles, soften_must_haves
+from ontology_matcher import OntologyMatcher
+from json_scan import JSONScanner, JSONExtractError, Fields, parse_json
 
 # ---------- config ----------
-OPENROUTER_KEY = os.environ.get("OPENROUTER_API_KEY")
-if not OPENROUTER_KEY:
-    raise SystemExit("Set OPENROUTER_API_KEY first")
-
-CHAT_URL = "https://openrouter.ai/api/v1/chat/completions"
 EMBED_MODEL = "openai/text-embedding-3-small"   # must match your vectors
 PARSER_MODEL = "openai/gpt-4o-mini"             # pick a chat model available to you on OpenRouter
 FINAL_MODEL  = "openai/gpt-4o-mini"             # you can use a stronger model if available
+VECTOR_INDEX = os.environ.get("VECTOR_INDEX", "flat")  # "ivf" for approximate search on large catalogs
+VECTOR_QUANT = os.environ.get("VECTOR_QUANT") or None  # "int8" or "pq" to keep only compressed codes in memory
+VECTOR_DIMS = int(os.environ.get("VECTOR_DIMS", 0)) or None  # e.g. 256/512: Matryoshka truncation
+RANK_FUSION = os.environ.get("RANK_FUSION", "rrf")  # "vector" ranks by embedding cosine only
+FUSION_POOL = 50   # rows taken from each ranking before fusion
+# "llm": FINAL_MODEL writes top_5; "local": scored from the catalog columns, no LLM call;
+# "local-first": local answer right away, LLM answer fetched in the background and cached
+# so the next identical request gets the polished version
+FINALIZE_MODES = ("llm", "local", "local-first")
+FINALIZE_MODE = os.environ.get("FINALIZE_MODE", "llm")
 
-# ---------- data ----------
-VEHICLES = json.load(open("data/vehicles.json"))
-ONTOLOGY = json.load(open("data/feature_ontology.json"))
-TRIM_VECS = json.load(open("data/trim_vectors.json"))
-
-BY_ID = {v["id"]: v for v in VEHICLES}
-MAT_IDS = list(TRIM_VECS.keys())
-MAT = np.array([TRIM_VECS[i] for i in MAT_IDS], dtype=np.float32)
-
-def call_llm(system, user, model=PARSER_MODEL, temperature=0.1):
-    payload = {
-        "model": model,
-        "messages": [
-            {"role":"system","content": system},
-            {"role":"user","content": user}
-        ],
-        "temperature": temperature
-    }
-    r = requests.post(
-        CHAT_URL,
-        headers={"Authorization": f"Bearer {OPENROUTER_KEY}", "Content-Type":"application/json"},
-        json=payload
-    )
-    r.raise_for_status()
-    return r.json()["choices"][0]["message"]["content"]
+# resolved next to this file so it works from any cwd; PILOT_DATA_DIR overrides
+DATA_DIR = os.environ.get("PILOT_DATA_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
 
-def apply_ontology(phrases):
-    out = []
-    for p in phrases:
-        key = ONTOLOGY.get(p.lower().strip())
-        out.append(key if key else p.lower().strip())
-    return sorted(list(set([x for x in out if x])))
+EMBED_BATCH = 256
+# data files a snapshot is built from; a change to any of them triggers a reload
+WATCHED_FILES = ("vehicles.json", "feature_ontology.json", "trim_docs.json", "trim_vectors.npy", "trim_vectors.meta.json",
+                 "trim_vectors.ivf.npz")
+WATCHED_PATTERNS = ("trim_vectors.*.npz",)  # quantized codes: trim_vectors.<mode>[_d<dims>].npz
+RELOAD_SECS = float(os.environ.get("PILOT_RELOAD_SECS", 2.0))  # 0 disables the watcher
 
+# ---------- prompts ----------
 EXTRACT_SYSTEM = (
     "You extract car-shopping preferences as strict JSON. "
     "Map obvious synonyms to canonical feature keys (e.g., 'seat warmers' -> 'heated_front_seats'). "
@@ -81,120 +73,41 @@ Return JSON with exactly these keys:
   "must_have": [],
   "nice_to_have": [],
   "powertrain_pref": "hybrid|gas|phev|ev|no-strong-preference",
+  "drive_type": "AWD|4WD|FWD|RWD|any",
+  "body_type": "SUV|Sedan|Truck|Hatchback|Minivan|any",
   "budget_total_usd": {{ "target": 0, "flex_pct": 10 }},
+  "color_pref": [],
   "notes": ""
 }}
 """
 
-def profile_to_text(p):
-    parts = []
-    if p.get("purpose"): parts.append("Purpose: " + ", ".join(p["purpose"]))
-    if p.get("location_tags"): parts.append("Location: " + ", ".join(p["location_tags"]))
-    if p.get("style_vibe"): parts.append("Style: " + ", ".join(p["style_vibe"]))
-    if p.get("must_have"): parts.append("Must-haves: " + ", ".join(p["must_have"]))
-    if p.get("nice_to_have"): parts.append("Nice-to-have: " + ", ".join(p["nice_to_have"]))
-    if p.get("powertrain_pref"): parts.append("Powertrain: " + p["powertrain_pref"])
-    return ". ".join(parts)
-
-def can_satisfy(trim, musts):
-    base = set(trim.get("features", []))
-    adds = set()
-    for p in trim.get("packages", []):
-        for a in p.get("adds", []):
-            adds.add(a)
-    for m in musts:
-        if m not in base and m not in adds:
-            return False
-    return True
-
-def suggest_packages(trim, musts):
-    rec = []
-    base = set(trim.get("features", []))
-    for m in musts:
-        if m in base: 
-            continue
-        for p in trim.get("packages", []):
-            if m in p.get("adds", []):
-                rec.append(p["name"])
-    return sorted(list(set(rec)))
-
-# ---------- Pilot input ----------
-user_free = {
-    "purpose":   "family and weekend road trips",
-    "location":  "Dallas suburbs, mostly highway, sometimes heavy rain",
-    "appearance":"sleek and modern",
-    "features":  "heated seats, blind spot",
-    "budget":    "around 40k"
-}
-
-# A) Extract structured prefs
-extract_user = EXTRACT_USER_TMPL.format(**user_free)
-raw = call_llm(PARSER_MODEL, extract_user, model=PARSER_MODEL, temperature=0.1)
-try:
-    prof = to_json(raw)
-except Exception:
-    print("Extraction failed. Raw:\n", raw)
-    raise
-
-# B) Normalize feature names
-prof["must_have"] = apply_ontology(prof.get("must_have", []))
-prof["nice_to_have"] = apply_ontology(prof.get("nice_to_have", []))
-
-# C) Rank by embeddings (we already built vectors with embed_build.py)
-u_text = profile_to_text(prof)
-# Reuse the same embedding model you used earlier -> vectors already on disk
-
-# Compute similarity against MAT
-from numpy.linalg import norm
-def cosine(a, b):
-    return np.dot(a, b) / (norm(a) * norm(b))
-
-# Get user embedding via OpenRouter embeddings (one-off call)
-EMBED_URL = "https://openrouter.ai/api/v1/embeddings"
-r = requests.post(
-    EMBED_URL,
-    headers={"Authorization": f"Bearer {OPENROUTER_KEY}", "Content-Type":"application/json"},
-    json={"model": EMBED_MODEL, "input": u_text}
-)
-r.raise_for_status()
-u_vec = np.array(r.json()["data"][0]["embedding"], dtype=np.float32)
-
-sims = MAT @ u_vec / (np.linalg.norm(MAT, axis=1) * np.linalg.norm(u_vec))
-top_idx = np.argsort(-sims)[:10]
-
-candidates = []
-for i in top_idx:
-    tid = MAT_IDS[i]
-    trim = BY_ID[tid]
-    if not can_satisfy(trim, prof["must_have"]):
-        continue
-    candidates.append({
-        "id": trim["id"],
-        "model": trim["model"],
-        "year": trim["year"],
-        "trim": trim["trim"],
-        "score_vector": float(sims[i]),
-        "suggested_packages": suggest_packages(trim, prof["must_have"]),
-        "detail_url": trim.get("detail_url",""),
-        "style_vibe": trim.get("style_vibe", []),
-        "features": trim.get("features", []),
-        "colors": trim.get("colors", [])
-    })
+NUM = (int, float, type(None))
+# strict: a reply of the wrong shape (e.g. a finalize-style {"top_5": ...}) fails and is retried
+PROFILE_SCHEMA = Fields(required={
+    "must_have": [str], "nice_to_have": [str],
+    "drive_type": (str, list), "body_type": (str, list),
+    "budget_total_usd": Fields(required={"target": NUM}, optional={"flex_pct": NUM}),
+}, optional={
+    "purpose": [str], "location_tags": [str], "style_vibe": [str], "powertrain_pref": str,
+    "color_pref": [str], "notes": str,
+}, extra=False)
+EXTRACT_ATTEMPTS = 2   # parser calls per extraction when the reply doesn't fit PROFILE_SCHEMA
 
 # D) Finalize with grounded LLM
 FINALIZE_SYSTEM = (
     "You are a grounded Toyota recommender. You receive a user profile and candidate trims "
     "with their true features/packages. Recommend ONLY from candidates. "
     "If a must-have is missing but available via a listed package, include that package in recommended_customizations. "
+    "Each candidate's configuration is the cheapest package/color build within the user's budget; prefer it. "
     "Do not invent features or packages. Return valid JSON."
 )
 
-FINALIZE_USER = f"""
+FINALIZE_USER_TMPL = """
 User profile:
-{json.dumps(prof, ensure_ascii=False)}
+{profile}
 
 Candidates:
-{json.dumps(candidates[:10], ensure_ascii=False)}
+{candidates}
 
 Return JSON:
 {{
@@ -213,14 +126,501 @@ Return JSON:
 }}
 """
 
-final_raw = call_llm(FINALIZE_SYSTEM, FINALIZE_USER, model=FINAL_MODEL, temperature=0.2)
-try:
-    result = json.loads(final_raw)
-except Exception:
-    print("Finalize failed. Raw:\n", final_raw)
-    raise
-
-print("\n=== USER PROFILE (normalized) ===")
-print(json.dumps(prof, indent=2))
-print("\n=== RECOMMENDATIONS ===")
-print(json.dumps(result, indent=2))
+FINAL_ITEM_SCHEMA = Fields(required={"id": str}, optional={
+    "model": str, "year": (int, str), "trim": str, "fit_score": NUM,
+    "reasons": [str], "recommended_customizations": [str],
+})
+FINAL_SCHEMA = Fields(required={"top_5": [FINAL_ITEM_SCHEMA]}, optional={"others": [dict]})
+
+def profile_to_text(p):
+    parts = []
+    if p.get("purpose"): parts.append("Purpose: " + ", ".join(p["purpose"]))
+    if p.get("location_tags"): parts.append("Location: " + ", ".join(p["location_tags"]))
+    if p.get("style_vibe"): parts.append("Style: " + ", ".join(p["style_vibe"]))
+    if p.get("must_have"): parts.append("Must-haves: " + ", ".join(p["must_have"]))
+    if p.get("nice_to_have"): parts.append("Nice-to-have: " + ", ".join(p["nice_to_have"]))
+    if p.get("powertrain_pref"): parts.append("Powertrain: " + p["powertrain_pref"])
+    return ". ".join(parts)
+
+def profile_terms(p):
+    """BM25 query: the profile's free-text values plus its canonical feature keys."""
+    words = p.get("purpose", []) + p.get("location_tags", []) + p.get("style_vibe", [])
+    words += as_list(p.get("powertrain_pref"))
+    return tokenize(" ".join(words)) + key_terms(p.get("must_have", []) + p.get("nice_to_have", []))
+
+def finalize_user(prof, shown):
+    return FINALIZE_USER_TMPL.format(
+        profile=json.dumps(prof, ensure_ascii=False),
+        candidates=json.dumps(shown, ensure_ascii=False),
+    )
+
+def data_fingerprint(data_dir):
+    """(name, mtime_ns, size) of each watched file; cheap enough to poll."""
+    out = []
+    names = list(WATCHED_FILES)
+    for pattern in WATCHED_PATTERNS:
+        names += sorted(os.path.basename(p) for p in glob.glob(os.path.join(data_dir, pattern)))
+    for name in dict.fromkeys(names):
+        try:
+            st = os.stat(os.path.join(data_dir, name))
+        except FileNotFoundError:
+            continue
+        out.append((name, st.st_mtime_ns, st.st_size))
+    return tuple(out)
+
+class CatalogSnapshot:
+    """One consistent version of the catalog: columnar trims, ontology matcher, vector
+    index and the row-aligned feature/constraint bitsets. Never mutated after construction."""
+
+    def __init__(self, data_dir, index_kind=VECTOR_INDEX, quant=VECTOR_QUANT, dims=VECTOR_DIMS, version=1):
+        self.data_dir = data_dir
+        self.version = version
+        self.fingerprint = data_fingerprint(data_dir)
+        # everything a candidate list depends on; precomputed quiz answers must match it
+        self.data_version = data_version(data_dir, {"embed_model": EMBED_MODEL, "fusion": RANK_FUSION,
+                                                    "index": [index_kind, quant, dims]})
+        self.loaded_at = time.time()
+        path = lambda name: os.path.join(data_dir, name)
+        self.catalog_version = catalog_version(path("vehicles.json"))
+        # flat or nested (model -> trims) vehicles.json, one columnar row per trim
+        self.catalog = load_catalog(path("vehicles.json"))
+        self.ontology = json.load(open(path("feature_ontology.json")))
+        # binary store written by embed_build.py (or vector_store.py from the old trim_vectors.json)
+        self.index = open_index(path("trim_vectors"), model=EMBED_MODEL, kind=index_kind, quant=quant, dims=dims)
+        # catalog row per index row; vectors for trims missing from vehicles.json are never returned
+        self.rows = self.catalog.rows(self.index.ids)
+        # row-aligned with the index: must-have checks and package lookups without per-call sets
+        self.features = FeatureIndex(self.index.ids, self.catalog, self.ontology)
+        # must-haves outside this set would empty every candidate list; they rank as nice-to-haves
+        self.available = self.features.available()
+        self.constraints = ConstraintIndex(self.index.ids, self.catalog)
+        # cheapest package/color build per trim under the budget, memoized per requirement set
+        self.configurator = Configurator(self.catalog)
+        # BM25 over the embedded doc text plus feature keys, for exact feature mentions
+        docs = {}
+        if os.path.exists(path("trim_docs.json")):
+            docs = {d["id"]: d.get("doc", "") for d in json.load(open(path("trim_docs.json")))}
+        self.lexical = BM25Index(self.index.ids, [
+            tokenize(docs.get(tid, "")) + (key_terms(self.catalog.features_of(r)) if r >= 0 else [])
+            for tid, r in zip(self.index.ids, self.rows)])
+        # phrase/fuzzy matcher and rule-based quiz extractor, compiled once against the ontology
+        self.matcher = OntologyMatcher(self.ontology)
+        self.quiz = QuizExtractor(self.matcher, self.available)
+
+    def apply_ontology(self, phrases):
+        out = []
+        for p in phrases:
+            key = self.matcher.lookup(p)
+            out.append(key if key else p.lower().strip())
+        return sorted(list(set([x for x in out if x])))
+
+    def configure(self, row, prof):
+        return self.configurator.configure(self.rows[row], prof.get("must_have", []), prof.get("nice_to_have", []),
+                                           prof.get("budget_total_usd"), prof.get("color_pref", []))
+
+    def candidate_row(self, row, sim, prof, lex=0.0, fused=None):
+        trim = self.catalog.record(self.rows[row])
+        config = self.configure(row, prof)
+        return {
+            "id": trim["id"],
+            "model": trim["model"],
+            "year": trim["year"],
+            "trim": trim["trim"],
+            "score_vector": float(sim),
+            "score_lexical": round(float(lex), 3),
+            "score_fused": round(float(sim if fused is None else fused), 4),
+            "suggested_packages": config["packages"],
+            "configuration": config,
+            "detail_url": trim.get("detail_url",""),
+            "style_vibe": trim.get("style_vibe", []),
+            "features": trim.get("features", []),
+            "colors": trim.get("colors", [])
+        }
+
+    def feasible_mask(self, profiles):
+        """(n_profiles, n_rows) bool: must-haves, powertrain, drive, body type and budget."""
+        ok = self.features.satisfies_batch([p.get("must_have", []) for p in profiles])
+        ok &= self.rows >= 0
+        for i, p in enumerate(profiles):
+            ok[i] = self.constraints.feasible(p, ok[i])
+        return ok
+
+    def rank_profiles(self, profiles, U, k=10):
+        # C) Filter by hard constraints first, then rank only feasible trims by embeddings
+        ok = self.feasible_mask(profiles)
+        if RANK_FUSION == "vector":
+            top_idx, top_sims = self.index.search_batch(U, k=k, masks=ok)
+            out = []
+            for p, idx, sims in zip(profiles, top_idx, top_sims):
+                keep = np.isfinite(sims)
+                out.append([self.candidate_row(i, sim, p) for i, sim in zip(idx[keep], sims[keep])])
+            return out
+        # hybrid: fuse the vector and BM25 rankings of the feasible rows
+        pool = max(k, FUSION_POOL)
+        top_idx, top_sims = self.index.search_batch(U, k=pool, masks=ok)
+        out = []
+        for p, u, mask, idx, sims in zip(profiles, U, ok, top_idx, top_sims):
+            vec_rows = idx[np.isfinite(sims)]
+            lex = self.lexical.scores(profile_terms(p))
+            lex_rows, _ = self.lexical.search_scores(lex, pool, mask)
+            rows, fused = fuse_rrf([vec_rows, lex_rows], k=k)
+            # exact cosine for the rows only the lexical ranking brought in
+            vec = self.index.score_rows(self.index.prep(u), np.array(rows, dtype=np.int64)) if rows else []
+            out.append([self.candidate_row(r, v, p, lex[r], f) for r, v, f in zip(rows, vec, fused)])
+        return out
+
+class RecommendationEngine:
+    """Serves requests against the live CatalogSnapshot plus the caches and the pooled LLM
+    client. Thread-safe for concurrent requests; the API key is only checked when an LLM
+    call is made."""
+
+    def __init__(self, data_dir=DATA_DIR, api_key=None, index_kind=VECTOR_INDEX,
+                 quant=VECTOR_QUANT, dims=VECTOR_DIMS, finalize_mode=FINALIZE_MODE):
+        if finalize_mode not in FINALIZE_MODES:
+            raise ValueError(f"finalize_mode must be one of {FINALIZE_MODES}, got {finalize_mode!r}")
+        self.finalize_mode = finalize_mode
+        self.data_dir = os.path.abspath(data_dir)
+        self.api_key = api_key or os.environ.get("OPENROUTER_API_KEY")
+        self._index_opts = {"index_kind": index_kind, "quant": quant, "dims": dims}
+        self.snapshot = CatalogSnapshot(self.data_dir, **self._index_opts)
+
+        # quiz answers repeat a lot, so profile embeddings are cached in memory and on disk
+        self.embed_cache = EmbedCache(self.path("embed_cache.sqlite"))
+        # finalize answers keyed by (model, temperature, profile, candidate ids, vehicles.json hash)
+        self.final_cache = ResponseCache(self.path("response_cache.sqlite"), self.snapshot.catalog_version)
+        # candidates (and maybe finalized answers) for known quizzes, from build_quiz_table.py
+        self.quiz_table = QuizTable(self.path("quiz_table.sqlite"))
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+        self._failed = None
+        self.reload_errors = 0
+        # background LLM finalize for "local-first"; keys in flight are not submitted twice
+        self._polisher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="polish")
+        self._polishing = set()
+        self._polish_lock = threading.Lock()
+
+    def path(self, name):
+        return os.path.join(self.data_dir, name)
+
+    @property
+    def client(self):
+        # one pooled client for every chat/embeddings call (timeouts, retries, metrics)
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    if not self.api_key:
+                        raise RuntimeError("Set OPENROUTER_API_KEY first")
+                    self._client = LLMClient(self.api_key, timeout=30)
+        return self._client
+
+    # ---------- hot reload ----------
+    def reload(self, force=False):
+        """Build a new snapshot if the data files changed, then swap it in. Returns True on swap."""
+        with self._reload_lock:
+            cur = self.snapshot
+            before = data_fingerprint(self.data_dir)
+            if not force and before in (cur.fingerprint, self._failed):
+                return False
+            try:
+                snap = CatalogSnapshot(self.data_dir, version=cur.version + 1, **self._index_opts)
+            except Exception:
+                # don't retry the same broken files every poll; the next write will change the fingerprint
+                self._failed = before
+                raise
+            if data_fingerprint(self.data_dir) != snap.fingerprint:
+                # files moved while loading (e.g. store written before its IVF); try next tick
+                return False
+            self.final_cache.set_version(snap.catalog_version)
+            self.snapshot = snap   # the swap: readers see the old or the new snapshot, never a mix
+            return True
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                if self.reload():
+                    snap = self.snapshot
+                    print(f"Reloaded catalog v{snap.version}: {len(snap.index.ids)} trims")
+            except Exception as e:
+                # keep serving the last good snapshot until the files are fixed
+                self.reload_errors += 1
+                print("Catalog reload failed, keeping the current snapshot:", e)
+
+    def watch(self, interval=RELOAD_SECS):
+        """Start the background file watcher (no-op if running or interval is 0)."""
+        if interval and self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, args=(interval,), name="catalog-watch", daemon=True)
+            self._watcher.start()
+        return self
+
+    def embed_texts(self, texts):
+        # cached rows are reused; the misses go out as batched `input` arrays
+        vecs = [self.embed_cache.get(EMBED_MODEL, t) for t in texts]
+        todo = sorted({t for t, v in zip(texts, vecs) if v is None})
+        fresh = {}
+        for i in range(0, len(todo), EMBED_BATCH):
+            chunk = todo[i:i + EMBED_BATCH]
+            rows, _ = self.client.embed(chunk, EMBED_MODEL)
+            for t, row in zip(chunk, rows):
+                fresh[t] = self.embed_cache.put(EMBED_MODEL, t, row)
+        return np.stack([v if v is not None else fresh[t] for t, v in zip(texts, vecs)])
+
+    def embed_text(self, text):
+        return self.embed_texts([text])[0]
+
+    def call_llm(self, system, user, model=PARSER_MODEL, temperature=0.1, deadline=60):
+        return self.client.chat(system, user, model, temperature=temperature, deadline=deadline)
+
+    def extract_profile(self, user_free, snap=None):
+        snap = snap or self.snapshot
+        # A) Extract structured prefs
+        extract_user = EXTRACT_USER_TMPL.format(**user_free)
+        for attempt in range(EXTRACT_ATTEMPTS):
+            raw = self.call_llm(EXTRACT_SYSTEM, extract_user, model=PARSER_MODEL, temperature=0.1)
+            try:
+                prof = parse_json(raw, PROFILE_SCHEMA)
+                break
+            except JSONExtractError as e:
+                if attempt == EXTRACT_ATTEMPTS - 1:
+                    print("Extraction failed. Raw:\n", raw)
+                    raise
+                print(f"Extraction reply rejected ({e}), retrying")
+
+        # B) Normalize feature names
+        prof["must_have"] = snap.apply_ontology(prof.get("must_have", []))
+        prof["nice_to_have"] = snap.apply_ontology(prof.get("nice_to_have", []))
+        return soften_must_haves(prof, snap.available)
+
+    def recommend_batch(self, profiles, k=10, snap=None):
+        """Candidate lists for many normalized profiles: one batched embed, one GEMM."""
+        if not profiles:
+            return []
+        snap = snap or self.snapshot
+        return snap.rank_profiles(profiles, self.embed_texts([profile_to_text(p) for p in profiles]), k=k)
+
+    def recommend_candidates(self, prof, k=10, snap=None):
+        return self.recommend_batch([prof], k=k, snap=snap)[0]
+
+    def _final_key(self, prof, shown, temperature, snap):
+        """(cache key, catalog version it was built with)."""
+        version = (snap or self.snapshot).catalog_version
+        return self.final_cache.key(FINAL_MODEL, temperature, prof, [c["id"] for c in shown], version=version), version
+
+    def finalize(self, prof, candidates, temperature=0.2, snap=None, mode=None):
+        mode = mode or self.finalize_mode
+        snap = snap or self.snapshot
+        shown = candidates[:10]
+        if not shown:
+            # nothing passed the filters; there is nothing for the LLM to rank
+            return {"top_5": [], "others": []}
+        if mode == "local":
+            return finalize_local(snap, prof, shown)
+        key, version = self._final_key(prof, shown, temperature, snap)
+        cached = self.final_cache.get(key)
+        if cached is not None:
+            return cached
+        if mode == "local-first":
+            self._polish(key, version, prof, shown, temperature)
+            return finalize_local(snap, prof, shown)
+        return self._finalize_llm(key, version, prof, shown, temperature)
+
+    def _finalize_llm(self, key, version, prof, shown, temperature):
+        final_raw = self.call_llm(FINALIZE_SYSTEM, finalize_user(prof, shown), model=FINAL_MODEL, temperature=temperature)
+        try:
+            result = parse_json(final_raw, FINAL_SCHEMA)
+        except Exception:
+            print("Finalize failed. Raw:\n", final_raw)
+            raise
+        return self.final_cache.put(key, result, version)
+
+    def _polish(self, key, version, prof, shown, temperature):
+        with self._polish_lock:
+            if key in self._polishing:
+                return
+            self._polishing.add(key)
+
+        def run():
+            try:
+                self._finalize_llm(key, version, prof, shown, temperature)
+            except Exception as e:
+                print("Background finalize failed:", e)
+            finally:
+                with self._polish_lock:
+                    self._polishing.discard(key)
+        self._polisher.submit(run)
+
+    def finalize_stream(self, prof, candidates, temperature=0.2, snap=None, mode=None):
+        """Yield top_5 recommendations one by one as the streamed finalize output completes them."""
+        if (mode or self.finalize_mode) != "llm":
+            # local answers are complete in milliseconds; nothing to stream
+            yield from self.finalize(prof, candidates, temperature, snap, mode)["top_5"]
+            return
+        shown = candidates[:10]
+        if not shown:
+            return
+        key, version = self._final_key(prof, shown, temperature, snap)
+        cached = self.final_cache.get(key)
+        if cached is not None:
+            yield from cached.get("top_5", [])
+            return
+        scan = JSONScanner(item_key="top_5", item_schema=FINAL_ITEM_SCHEMA)
+        for delta in self.client.stream_chat(FINALIZE_SYSTEM, finalize_user(prof, shown), FINAL_MODEL,
+                                             temperature=temperature, deadline=60):
+            yield from scan.feed(delta)
+        try:
+            result = scan.result(FINAL_SCHEMA)
+        except Exception:
+            print("Finalize failed. Raw:\n", scan.text)
+            raise
+        self.final_cache.put(key, result, version)
+
+    async def prepare_quiz_async(self, quiz, k=10, snap=None):
+        """State.get_quiz_data answers -> (profile, candidates), run as a DAG.
+
+        Checkbox answers and recognizable custom text become profile fields locally and are
+        embedded right away; only custom text with unknown words goes to the extraction
+        LLM, concurrently with the embedding.
+        """
+        snap = snap or self.snapshot
+        prof, unknown = snap.quiz.extract(quiz)
+        texts = [profile_to_text(prof)] + ([". ".join(unknown.values())] if unknown else [])
+        embed = asyncio.create_task(asyncio.to_thread(self.embed_texts, texts))
+        if unknown:
+            free = {field: unknown.get(field, "") for field in QUIZ_FIELDS.values()}
+            try:
+                llm_prof = await asyncio.to_thread(self.extract_profile, free, snap)
+                prof = merge_profiles(prof, llm_prof, budget_from_extra=True)
+            except Exception as e:
+                # the rule-based profile is still usable; don't fail the request over the extra text
+                print("Custom-answer extraction failed, using rule-based profile only:", e)
+        U = await embed
+        u = l2_normalize(l2_normalize(U).sum(axis=0))
+        return prof, snap.rank_profiles([prof], u[None], k=k)[0]
+
+    def lookup_quiz(self, quiz, k=10, snap=None, mode=None):
+        """(profile, candidates, stored result or None) from the precomputed table, or None.
+
+        Only quizzes without unrecognized custom text have a deterministic profile. A stored
+        result is returned only if the requested finalize mode could have produced it."""
+        snap = snap or self.snapshot
+        prof, unknown = snap.quiz.extract(quiz)
+        if unknown:
+            return None
+        hit = self.quiz_table.get(quiz_key(prof, k), snap.data_version)
+        if hit is None:
+            return None
+        candidates, result, made_by = hit
+        mode = mode or self.finalize_mode
+        if made_by != mode and not (made_by == "llm" and mode == "local-first"):
+            result = None
+        return prof, candidates, result
+
+    async def recommend_quiz_async(self, quiz, k=10, mode=None):
+        """State.get_quiz_data answers -> (profile, candidates, result)."""
+        snap = self.snapshot
+        hit = self.lookup_quiz(quiz, k, snap, mode)
+        if hit is not None and hit[2] is not None:
+            return hit
+        if hit is not None:
+            prof, candidates, _ = hit
+        else:
+            prof, candidates = await self.prepare_quiz_async(quiz, k=k, snap=snap)
+        result = await asyncio.to_thread(self.finalize, prof, candidates, 0.2, snap, mode)
+        return prof, candidates, result
+
+    def recommend_quiz(self, quiz, k=10, mode=None):
+        return asyncio.run(self.recommend_quiz_async(quiz, k=k, mode=mode))
+
+    def recommend_quiz_stream(self, quiz, k=10, mode=None):
+        """Like recommend_quiz, but yields each top_5 recommendation as soon as it is complete."""
+        snap = self.snapshot
+        hit = self.lookup_quiz(quiz, k, snap, mode)
+        if hit is not None and hit[2] is not None:
+            yield from hit[2]["top_5"]
+            return
+        if hit is not None:
+            prof, candidates, _ = hit
+        else:
+            prof, candidates = asyncio.run(self.prepare_quiz_async(quiz, k=k, snap=snap))
+        yield from self.finalize_stream(prof, candidates, snap=snap, mode=mode)
+
+    def recommend_free(self, user_free, k=10, mode=None):
+        """Free-text answers (EXTRACT_USER_TMPL fields) -> (profile, candidates, result)."""
+        snap = self.snapshot
+        prof = self.extract_profile(user_free, snap)
+        candidates = self.recommend_candidates(prof, k=k, snap=snap)
+        return prof, candidates, self.finalize(prof, candidates, snap=snap, mode=mode)
+
+    def stats(self):
+        snap = self.snapshot
+        return {
+            "catalog_version": snap.version,
+            "loaded_at": snap.loaded_at,
+            "reload_errors": self.reload_errors,
+            "trims": len(snap.index.ids),
+            "finalize_mode": self.finalize_mode,
+            "configurator": snap.configurator.stats(),
+            "quiz_table": self.quiz_table.stats(),
+            "embedding_cache": self.embed_cache.stats(),
+            "response_cache": self.final_cache.stats(),
+            "llm_client": self._client.metrics() if self._client else {},
+        }
+
+    def close(self):
+        self._stop.set()
+        self._polisher.shutdown(cancel_futures=True)
+        self.embed_cache.close()
+        self.final_cache.close()
+        self.quiz_table.close()
+        if self._client:
+            self._client.close()
+
+_ENGINE = None
+_ENGINE_LOCK = threading.Lock()
+
+def load_quiz(path):
+    """The quiz in a JSON file, or the last complete submission in a quiz_store JSONL log."""
+    rows = read_submissions(path)
+    if not rows:
+        raise SystemExit(f"No quiz submissions in {path}")
+    return rows[-1].get("quiz", rows[-1])
+
+def get_engine():
+    """The shared per-process engine, built on first use, with the data watcher running."""
+    global _ENGINE
+    if _ENGINE is None:
+        with _ENGINE_LOCK:
+            if _ENGINE is None:
+                _ENGINE = RecommendationEngine().watch()
+    return _ENGINE
+
+# ---------- Pilot input ----------
+user_free = {
+    "purpose":   "family and weekend road trips",
+    "location":  "Dallas suburbs, mostly highway, sometimes heavy rain",
+    "appearance":"sleek and modern",
+    "features":  "heated seats, blind spot",
+    "budget":    "around 40k"
+}
+
+if __name__ == "__main__":
+    if not os.environ.get("OPENROUTER_API_KEY"):
+        raise SystemExit("Set OPENROUTER_API_KEY first")
+    engine = get_engine()
+    if len(sys.argv) > 1:
+        # python recommend.py ../frontend/quiz_data/quiz_responses.jsonl (latest submission)
+        # or a single State.get_quiz_data JSON file
+        prof, candidates, result = engine.recommend_quiz(load_quiz(sys.argv[1]))
+    else:
+        prof, candidates, result = engine.recommend_free(user_free)
+
+    print("\n=== USER PROFILE (normalized) ===")
+    print(json.dumps(prof, indent=2))
+    print("\n=== RECOMMENDATIONS ===")
+    print(json.dumps(result, indent=2))
+    stats = engine.stats()
+    print("\nembedding cache:", stats["embedding_cache"])
+    print("response cache:", stats["response_cache"])
+    print("llm client:", stats["llm_client"])
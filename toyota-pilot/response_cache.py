@@ -0,0 +1,107 @@
+# response_cache.py
+# SQLite cache for finalize completions. The key is a canonical hash of everything the
+# FINALIZE_USER prompt is built from: model, temperature, normalized profile, candidate
+# id set and catalog version. Entries expire after a TTL, the table is trimmed LRU-first,
+# and rows from an older catalog version are purged when vehicles.json changes.
+import json, time, sqlite3, hashlib, threading
+
+def catalog_version(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+def _canonical(obj):
+    # order-insensitive for lists of plain values, so ["b", "a"] and ["a", "b"] hash alike
+    if isinstance(obj, dict):
+        return {k: _canonical(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        vals = [_canonical(v) for v in obj]
+        if all(isinstance(v, (str, int, float)) for v in vals):
+            return sorted(vals, key=lambda v: (type(v).__name__, v))
+        return vals
+    return obj
+
+def response_key(model, temperature, profile, candidate_ids, version):
+    payload = {
+        "model": model,
+        "temperature": temperature,
+        "profile": _canonical(profile),
+        "candidates": sorted(candidate_ids),
+        "catalog": version,
+    }
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    def __init__(self, path, version, ttl=7 * 24 * 3600, max_entries=20_000):
+        self.version = version
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, catalog TEXT NOT NULL, body TEXT NOT NULL,"
+            " created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)")
+        # a new vehicles.json invalidates everything cached against the old one
+        self._db.execute("DELETE FROM responses WHERE catalog != ?", (version,))
+        self._db.commit()
+
+    def key(self, model, temperature, profile, candidate_ids, version=None):
+        return response_key(model, temperature, profile, candidate_ids, version or self.version)
+
+    def set_version(self, version):
+        """Switch to a new catalog version, dropping everything cached for other versions."""
+        with self._lock:
+            if version == self.version:
+                return
+            self.version = version
+            self._db.execute("DELETE FROM responses WHERE catalog != ?", (version,))
+            self._db.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT body, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key, value, version=None):
+        """Store value under key; version is the one key() was built with (default: current).
+        A value computed against a catalog that has since been replaced is not stored."""
+        now = time.time()
+        version = version or self.version
+        with self._lock:
+            if version != self.version:
+                return value
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, catalog, body, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, version, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+        return value
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
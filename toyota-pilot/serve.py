@@ -0,0 +1,113 @@
+# serve.py
+# Local HTTP endpoint for RecommendationEngine. The engine is loaded once at startup and
+# a fixed pool of worker threads serves requests, so per-request latency is only the
+# recommendation itself.
+#   POST /recommend         {"quiz": {...}} or {"free": {...}} -> {"profile", "candidates", "result"}
+#   POST /recommend/stream  {"quiz": {...}} -> NDJSON, one top_5 recommendation per line
+#   both accept "mode": "llm" | "local" | "local-first" to override the engine's finalize mode
+#   GET  /health            -> engine stats
+import os, sys, json, argparse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from recommend import FINALIZE_MODES, get_engine
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that hands each connection to a bounded thread pool."""
+
+    def __init__(self, addr, handler, engine, workers=4):
+        super().__init__(addr, handler)
+        self.engine = engine
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="recommend")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._work, request, client_address)
+
+    def _work(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, status, obj):
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, self.server.engine.stats())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        engine = self.server.engine
+        try:
+            req = self._read_json()
+        except ValueError as e:
+            return self._send_json(400, {"error": f"invalid JSON body: {e}"})
+        if req.get("mode") not in (None,) + FINALIZE_MODES:
+            return self._send_json(400, {"error": f"mode must be one of {list(FINALIZE_MODES)}"})
+        if self.path == "/recommend/stream":
+            return self._stream(engine, req)
+        if self.path != "/recommend":
+            return self._send_json(404, {"error": "not found"})
+        try:
+            if "quiz" in req:
+                prof, candidates, result = engine.recommend_quiz(req["quiz"], k=req.get("k", 10), mode=req.get("mode"))
+            elif "free" in req:
+                prof, candidates, result = engine.recommend_free(req["free"], k=req.get("k", 10), mode=req.get("mode"))
+            else:
+                return self._send_json(400, {"error": "expected a 'quiz' or 'free' object"})
+        except Exception as e:
+            return self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+        self._send_json(200, {"profile": prof, "candidates": candidates, "result": result})
+
+    def _stream(self, engine, req):
+        if "quiz" not in req:
+            return self._send_json(400, {"error": "expected a 'quiz' object"})
+        # HTTP/1.0 without Content-Length: the body ends when the connection closes
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            for rec in engine.recommend_quiz_stream(req["quiz"], k=req.get("k", 10), mode=req.get("mode")):
+                self.wfile.write(json.dumps(rec, ensure_ascii=False).encode("utf-8") + b"\n")
+                self.wfile.flush()
+        except Exception as e:
+            self.wfile.write(json.dumps({"error": f"{type(e).__name__}: {e}"}).encode("utf-8") + b"\n")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Serve recommendations over HTTP")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--workers", type=int, default=4)
+    args = ap.parse_args()
+    if not os.environ.get("OPENROUTER_API_KEY"):
+        sys.exit("Set OPENROUTER_API_KEY first")
+    engine = get_engine()
+    server = PooledHTTPServer((args.host, args.port), Handler, engine, workers=args.workers)
+    print(f"✅ Serving {len(engine.snapshot.index.ids)} trims on http://{args.host}:{args.port} with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        engine.close()
@@ -0,0 +1,78 @@
+# test_configure.py
+# Configurator against brute force over every package subset on random synthetic trims,
+# and the greedy cover for more must-haves than the DP solves exactly.
+# Run with: python -m pytest -q test_configure.py
+import time, random
+from itertools import combinations
+import pytest
+import configure
+from catalog import Catalog
+from configure import Configurator
+from constraints import max_price
+
+FEATURES = [f"f{i}" for i in range(10)]
+
+def random_trim(rng, i, n_packages):
+    return {
+        "id": f"t{i}", "model": "M", "trim": f"T{i}", "msrp_usd": rng.randrange(30000, 40000, 100),
+        "features": rng.sample(FEATURES, rng.randint(0, 3)),
+        "packages": [{"name": f"P{i}.{j}", "adds": rng.sample(FEATURES, rng.randint(1, 4)),
+                      "price_usd": rng.randrange(200, 3000, 50)} for j in range(n_packages)],
+        "colors": [{"name": "White", "extra_cost": False}],
+    }
+
+def score(trim, names, musts, nices, budget):
+    """configure()'s ranking key for buying the named packages: musts covered, within
+    budget, nice-to-haves added (only while within budget), cheapest."""
+    pkgs = [p for p in trim["packages"] if p["name"] in names]
+    base = set(trim["features"])
+    have = base.union(*(p["adds"] for p in pkgs))
+    cost = sum(p["price_usd"] for p in pkgs)
+    cap = max_price(budget)
+    fits = cap is None or trim["msrp_usd"] + cost <= cap
+    extra = len((set(nices) - set(musts)) & (have - base)) if fits else 0
+    return len(set(musts) & have), fits, extra, -cost
+
+def brute_force(trim, musts, nices, budget):
+    names = [p["name"] for p in trim["packages"]]
+    return max(score(trim, set(c), musts, nices, budget)
+               for k in range(len(names) + 1) for c in combinations(names, k))
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_brute_force(seed):
+    rng = random.Random(seed)
+    trims = [random_trim(rng, i, rng.randint(0, 7)) for i in range(5)]
+    conf = Configurator(Catalog(trims))
+    for r, trim in enumerate(trims):
+        for _ in range(10):
+            musts = rng.sample(FEATURES, rng.randint(0, 4))
+            nices = rng.sample(FEATURES, rng.randint(0, 6))
+            budget = {"target": rng.randrange(30000, 45000, 500), "flex_pct": 10} if rng.random() < 0.8 else None
+            out = conf.configure(r, musts, nices, budget)
+            got = score(trim, set(out["packages"]), musts, nices, budget)
+            assert got == brute_force(trim, musts, nices, budget), (seed, r, musts, nices, budget)
+            assert out["package_cost_usd"] == -got[3]
+    assert conf.hits + conf.misses == 50
+
+def test_many_musts_use_greedy_cover():
+    rng = random.Random(0)
+    feats = [f"g{i}" for i in range(24)]
+    trim = {
+        "id": "t0", "model": "M", "trim": "T0", "msrp_usd": 30000, "features": [],
+        "packages": [{"name": f"P{j}", "adds": rng.sample(feats, 3), "price_usd": rng.randrange(200, 3000, 50)}
+                     for j in range(20)],
+        "colors": [],
+    }
+    addable = set().union(*(p["adds"] for p in trim["packages"]))
+    musts, nices = feats[:14], feats[14:22]
+    conf = Configurator(Catalog([trim]))
+    start = time.perf_counter()
+    out = conf.configure(0, musts, nices, {"target": 60000, "flex_pct": 10})
+    assert time.perf_counter() - start < 0.5
+    assert len(musts) > configure.MAX_BITS
+    # every must some package adds is bought, and no bought package is redundant
+    assert set(out["missing_must_have"]) == set(musts) - addable
+    bought = [p for p in trim["packages"] if p["name"] in out["packages"]]
+    for p in bought:
+        rest = set().union(*(q["adds"] for q in bought if q is not p))
+        assert not (set(p["adds"]) & set(musts)) <= rest
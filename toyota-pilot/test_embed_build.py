@@ -0,0 +1,118 @@
+# test_embed_build.py
+# embed_build.py against a local stub embeddings server: batching, retry on 429/5xx and
+# the throughput report. Run with: python -m pytest -q test_embed_build.py
+import sys, json, threading, functools
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+import pytest
+import embed_build
+from llm_client import LLMClient, LLMError
+from vector_store import open_store
+
+DIM = 8
+
+def stub_vector(text):
+    # "doc 7" -> [7, 1, 0, ...], so a vector shows which doc it came from
+    v = [0.0] * DIM
+    v[0], v[1] = float(text.split()[-1]), 1.0
+    return v
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status, obj, headers=()):
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        for k, v in headers:
+            self.send_header(k, v)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        srv = self.server
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with srv.lock:
+            srv.requests += 1
+            fail = srv.failures.pop(0) if srv.failures else None
+        if self.path != "/embeddings":
+            return self._send(404, {"error": "not found"})
+        if fail == 429:
+            return self._send(429, {"error": "rate limited"}, [("Retry-After", "0")])
+        if fail:
+            return self._send(fail, {"error": "stub failure"})
+        inputs = payload["input"]
+        with srv.lock:
+            srv.batches.append(len(inputs))
+        self._send(200, {
+            # out of order on purpose: the client has to sort by index
+            "data": [{"index": i, "embedding": stub_vector(t)} for i, t in reversed(list(enumerate(inputs)))],
+            "usage": {"prompt_tokens": 2 * len(inputs)},
+        })
+
+@pytest.fixture
+def stub():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    srv.lock = threading.Lock()
+    srv.requests, srv.batches, srv.failures = 0, [], []
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    srv.url = f"http://127.0.0.1:{srv.server_address[1]}"
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+def client_for(stub, **kw):
+    return LLMClient("test-key", base_url=stub.url, backoff_base=0.0, **kw)
+
+def docs(n):
+    return [{"id": f"trim-{i}", "doc": f"doc {i}"} for i in range(n)]
+
+def test_batches_and_order(stub):
+    out, stats = embed_build.embed_docs(client_for(stub), docs(10), batch_size=4, concurrency=3)
+    assert sorted(stub.batches) == [2, 4, 4]
+    assert {tid: vec[0] for tid, vec in out.items()} == {f"trim-{i}": float(i) for i in range(10)}
+    assert stats["docs"] == 10 and stats["batches"] == 3 and stats["tokens"] == 20
+    assert stats["docs_per_sec"] > 0 and stats["tokens_per_sec"] > 0
+
+def test_retries_429_and_5xx(stub):
+    stub.failures = [429, 503, 500]
+    client = client_for(stub, max_retries=3)
+    out, _ = embed_build.embed_docs(client, docs(3), batch_size=8)
+    assert len(out) == 3 and stub.requests == 4
+    m = client.metrics()["embeddings"]
+    assert m["retries"] == 3 and m["errors"] == 3
+
+def test_gives_up_after_max_retries(stub):
+    stub.failures = [503] * 3
+    with pytest.raises(LLMError):
+        embed_build.embed_docs(client_for(stub, max_retries=2), docs(2))
+    assert stub.requests == 3
+
+def test_no_retry_on_client_error(stub):
+    stub.failures = [400]
+    with pytest.raises(LLMError) as e:
+        embed_build.embed_docs(client_for(stub, max_retries=3), docs(2))
+    assert e.value.status == 400 and stub.requests == 1
+
+def test_main_reports_throughput(stub, tmp_path, monkeypatch, capsys):
+    src = tmp_path / "trim_docs.json"
+    src.write_text(json.dumps(docs(5)))
+    base = str(tmp_path / "trim_vectors")
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    monkeypatch.setattr(embed_build, "LLMClient", functools.partial(LLMClient, base_url=stub.url))
+    argv = ["embed_build.py", "--docs", str(src), "--out", base, "--batch-size", "2"]
+    monkeypatch.setattr(sys, "argv", argv)
+    embed_build.main()
+    out = capsys.readouterr().out
+    assert "0 unchanged, 5 to embed" in out
+    assert "3 batches in" in out and "docs/sec" in out and "tokens/sec" in out
+    ids, mat, _ = open_store(base, model=embed_build.MODEL)
+    assert ids == [f"trim-{i}" for i in range(5)] and mat.shape == (5, DIM)
+
+    # unchanged docs are not sent again
+    embed_build.main()
+    assert "5 unchanged, 0 to embed" in capsys.readouterr().out
+    assert sorted(stub.batches) == [1, 2, 2]
+    assert np.allclose(open_store(base)[1], mat)
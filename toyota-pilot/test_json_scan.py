@@ -0,0 +1,50 @@
+# test_json_scan.py
+# PROFILE_SCHEMA only accepts extraction-shaped replies, and extract_profile retries one
+# that doesn't fit. Run with: python -m pytest -q test_json_scan.py
+import json
+from types import SimpleNamespace
+import pytest
+from json_scan import JSONExtractError, parse_json
+from recommend import PROFILE_SCHEMA, RecommendationEngine
+
+PROFILE = {
+    "purpose": ["family"], "location_tags": ["suburbs"], "style_vibe": [],
+    "must_have": ["heated seats"], "nice_to_have": [], "powertrain_pref": "hybrid",
+    "drive_type": "any", "body_type": ["SUV"],
+    "budget_total_usd": {"target": 40000, "flex_pct": 10}, "color_pref": [], "notes": "",
+}
+FINALIZE_REPLY = {"top_5": [{"id": "rav4h-2025-xle-awd", "fit_score": 90}], "others": []}
+
+def fenced(obj):
+    return "Here you go:\n```json\n" + json.dumps(obj) + "\n```"
+
+def test_profile_reply_passes():
+    assert parse_json(fenced(PROFILE), PROFILE_SCHEMA) == PROFILE
+
+def test_finalize_shaped_reply_fails():
+    with pytest.raises(JSONExtractError, match="must_have: missing"):
+        parse_json(fenced(FINALIZE_REPLY), PROFILE_SCHEMA)
+
+def test_unexpected_key_fails():
+    with pytest.raises(JSONExtractError, match="top_5: unexpected key"):
+        parse_json(fenced({**PROFILE, "top_5": []}), PROFILE_SCHEMA)
+
+@pytest.mark.parametrize("key", ["must_have", "nice_to_have", "budget_total_usd", "drive_type", "body_type"])
+def test_core_keys_required(key):
+    with pytest.raises(JSONExtractError, match=f"{key}: missing"):
+        parse_json(fenced({k: v for k, v in PROFILE.items() if k != key}), PROFILE_SCHEMA)
+
+def test_extract_profile_retries_wrong_shape():
+    replies = [fenced(FINALIZE_REPLY), fenced(PROFILE)]
+    engine = RecommendationEngine.__new__(RecommendationEngine)
+    engine.call_llm = lambda *a, **kw: replies.pop(0)
+    snap = SimpleNamespace(apply_ontology=lambda phrases: ["heated_front_seats"] if phrases else [],
+                           available={"heated_front_seats"})
+    free = dict.fromkeys(("purpose", "location", "appearance", "features", "budget"), "")
+    prof = engine.extract_profile(free, snap)
+    assert not replies and prof["must_have"] == ["heated_front_seats"]
+
+    replies[:] = [fenced(FINALIZE_REPLY)] * 2
+    with pytest.raises(JSONExtractError):
+        engine.extract_profile(free, snap)
+    assert not replies
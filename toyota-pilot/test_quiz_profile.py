@@ -0,0 +1,97 @@
+# test_quiz_profile.py
+# The quiz rules, the ontology and vehicles.json share one feature vocabulary, and a
+# checkbox never empties the candidate list. Run with: python -m pytest -q test_quiz_profile.py
+import os, json
+import pytest
+from catalog import load_catalog
+from feature_index import FeatureIndex
+from ontology_matcher import OntologyMatcher
+from quiz_profile import QUESTION_RULES, OPTION_RULES, QuizExtractor, merge_profiles, soften_must_haves
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+@pytest.fixture(scope="module")
+def data():
+    catalog = load_catalog(os.path.join(DATA_DIR, "vehicles.json"))
+    ontology = json.load(open(os.path.join(DATA_DIR, "feature_ontology.json")))
+    features = FeatureIndex(catalog.ids, catalog, ontology)
+    return catalog, ontology, features
+
+def rule_features(rule):
+    return rule.get("must_have", []) + rule.get("nice_to_have", [])
+
+def quiz_with(features=(), body=None, custom=None):
+    quiz = {q: {"selected_options": [], "custom_answer": ""} for q in ("question_1", "question_2", "question_3",
+                                                                      "question_4", "question_5")}
+    quiz["question_4"]["selected_options"] = list(features)
+    if body:
+        quiz["question_3"]["selected_options"] = [body]
+    for q, text in (custom or {}).items():
+        quiz[q]["custom_answer"] = text
+    return quiz
+
+def test_option_rule_features_are_known(data):
+    catalog, ontology, _ = data
+    known = set(catalog.features.items[1:]) | set(ontology.values())
+    unknown = {head: f for head, rule in OPTION_RULES.items() for f in rule_features(rule) if f not in known}
+    assert not unknown, f"quiz options emit feature keys neither vehicles.json nor the ontology uses: {unknown}"
+
+def test_checkbox_matches_custom_text(data):
+    # ticking "Adaptive cruise control" and typing it must ask for the same key
+    matcher = OntologyMatcher(data[1])
+    for head, rule in QUESTION_RULES["question_4"].items():
+        assert matcher.lookup(head) in rule_features(rule), head
+
+def test_ontology_uses_catalog_keys(data):
+    catalog, ontology, _ = data
+    # each catalog key is its own canonical name: the ontology never maps a phrase for
+    # it to a different key
+    matcher = OntologyMatcher(ontology)
+    for key in catalog.features.items[1:]:
+        hit = matcher.lookup(key.replace("_", " "))
+        assert hit in (None, key), f"{key!r} is spelled {hit!r} in the ontology"
+
+def test_each_checkbox_leaves_candidates(data):
+    catalog, ontology, features = data
+    extractor = QuizExtractor(OntologyMatcher(ontology), features.available())
+    for head in QUESTION_RULES["question_4"]:
+        prof, unknown = extractor.extract(quiz_with([head]))
+        assert not unknown
+        assert features.satisfies(prof["must_have"]).any(), head
+
+def test_unlisted_must_have_becomes_nice_to_have(data):
+    catalog, ontology, features = data
+    assert "power_liftgate" not in features.available()
+    extractor = QuizExtractor(OntologyMatcher(ontology), features.available())
+    prof, _ = extractor.extract(quiz_with(["Power liftgate – easy trunk access", "Heated front seats"]))
+    assert prof["must_have"] == ["heated_front_seats"]
+    assert "power_liftgate" in prof["nice_to_have"]
+    assert soften_must_haves(prof, features.available()) is prof
+
+@pytest.mark.parametrize("text, target", [
+    ("$42,000", 42000), ("around 42k", 42000), ("my budget is 42000", 42000),
+    ("I tow a 7,000 lb camper", 0), ("under 60000 miles a year", 0),
+])
+def test_only_cued_amounts_are_budgets(data, text, target):
+    extractor = QuizExtractor(OntologyMatcher(data[1]), data[2].available())
+    prof, unknown = extractor.extract(quiz_with(custom={"question_2": text}))
+    assert prof["budget_total_usd"]["target"] == target
+    # an amount the rules did not take as a budget is left to the parser LLM
+    assert ("purpose" in unknown) == (target == 0)
+
+def test_llm_budget_wins_over_rules():
+    rules = {"budget_total_usd": {"target": 40000, "flex_pct": 12}}
+    llm = {"budget_total_usd": {"target": 32000, "flex_pct": 10}}
+    assert merge_profiles(rules, llm)["budget_total_usd"]["target"] == 40000
+    assert merge_profiles(rules, llm, budget_from_extra=True)["budget_total_usd"]["target"] == 32000
+    # an LLM reply without a budget (target 0) keeps the rule-derived one
+    none = {"budget_total_usd": {"target": 0, "flex_pct": 10}}
+    assert merge_profiles(rules, none, budget_from_extra=True)["budget_total_usd"]["target"] == 40000
+
+@pytest.mark.parametrize("text", ["no third row", "don't need AWD", "anything without leather seats",
+                                  "I don\u2019t want a sunroof"])
+def test_negated_answer_goes_to_llm(data, text):
+    extractor = QuizExtractor(OntologyMatcher(data[1]), data[2].available())
+    prof, unknown = extractor.extract(quiz_with(custom={"question_4": text}))
+    assert unknown == {"features": text}
+    assert not prof["must_have"] and not prof["nice_to_have"] and not prof["drive_type"]
@@ -0,0 +1,79 @@
+# test_vector_index.py
+# Approximate (IVF) and compressed (int8 / PQ) indexes against exact flat search on
+# fixed seeded data.
+# Run with: python -m pytest -q test_vector_index.py
+import numpy as np
+import pytest
+from vector_index import VectorIndex, IVFIndex, build_ivf
+from vector_store import write_store
+from quantize import Int8Index, PQIndex, open_quantized, save_quantized
+
+N, DIM, K = 2000, 64, 10
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(7)
+    centers = rng.standard_normal((40, DIM))
+    X = (centers[rng.integers(40, size=N)] + 0.5 * rng.standard_normal((N, DIM))).astype(np.float32)
+    Q = (X[rng.integers(N, size=50)] + 0.3 * rng.standard_normal((50, DIM))).astype(np.float32)
+    return [f"t{i}" for i in range(N)], X, Q
+
+def test_ivf_full_probe_is_exact(data):
+    ids, X, Q = data
+    flat = VectorIndex(ids, X)
+    ivf = IVFIndex(ids, X, nlist=16, nprobe=16)
+    for q in Q:
+        fi, fs = flat.search(q, K)
+        ii, iscores = ivf.search(q, K)
+        assert list(ii) == list(fi)
+        assert np.allclose(iscores, fs, atol=1e-5)
+
+def test_ivf_full_probe_is_exact_with_mask(data):
+    ids, X, Q = data
+    flat = VectorIndex(ids, X)
+    ivf = IVFIndex(ids, X, nlist=16, nprobe=16)
+    mask = np.random.default_rng(1).random(N) < 0.2
+    for q in Q[:10]:
+        assert list(ivf.search(q, K, mask=mask)[0]) == list(flat.search(q, K, mask=mask)[0])
+
+def test_ivf_partial_probe_recall(data):
+    ids, X, Q = data
+    flat = VectorIndex(ids, X)
+    ivf = IVFIndex(ids, X, nlist=16, nprobe=4)
+    recall = np.mean([len(set(ivf.search(q, K)[0]) & set(flat.search(q, K)[0])) / K for q in Q])
+    assert recall >= 0.9
+
+def test_ivf_saved_index_is_reused(data, tmp_path):
+    ids, X, Q = data
+    base = str(tmp_path / "vecs")
+    write_store(base, ids, X, "m")
+    built = build_ivf(base, nlist=16, nprobe=16)
+    loaded = IVFIndex.from_store(base)
+    assert np.array_equal(loaded.assign, built.assign)
+    assert list(loaded.search(Q[0], K)[0]) == list(built.search(Q[0], K)[0])
+
+def overlap(ix, flat, Q):
+    return np.mean([len(set(ix.search(q, K)[0]) & set(flat.search(q, K)[0])) / K for q in Q])
+
+def test_int8_matches_flat(data):
+    ids, X, Q = data
+    flat, int8 = VectorIndex(ids, X), Int8Index(ids, X)
+    assert overlap(int8, flat, Q) >= 0.95
+    assert all(int8.search(q, 1)[0][0] == flat.search(q, 1)[0][0] for q in Q)
+    assert int8.nbytes < flat.nbytes / 3.5
+
+def test_pq_keeps_the_true_nearest(data):
+    ids, X, Q = data
+    flat, pq = VectorIndex(ids, X), PQIndex(ids, X, m=32)
+    assert overlap(pq, flat, Q) >= 0.7
+    assert all(flat.search(q, 1)[0][0] in pq.search(q, K)[0] for q in Q)
+
+def test_saved_codes_are_reused(data, tmp_path):
+    ids, X, Q = data
+    base = str(tmp_path / "vecs")
+    header = write_store(base, ids, X, "m")
+    built = Int8Index(ids, X)
+    save_quantized(built, base, header)
+    loaded = open_quantized(base, mode="int8")
+    assert np.array_equal(loaded.codes, built.codes)
+    assert list(loaded.search(Q[0], K)[0]) == list(built.search(Q[0], K)[0])
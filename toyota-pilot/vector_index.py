@@ -0,0 +1,266 @@
+# vector_index.py
+# Cosine ranking over the trim vector store. The store holds L2-normalized rows, so a
+# query is a single mat-vec product straight against the memmap, and top-k uses
+# argpartition instead of a full sort.
+# VectorIndex is exact flat search; IVFIndex is an inverted-file ANN index (spherical
+# k-means coarse quantizer) for large catalogs, saved next to the store as <base>.ivf.npz.
+# Compressed (int8 / PQ) flat variants live in quantize.py.
+import os, sys, json, hashlib, argparse, numpy as np
+from vector_store import open_store
+
+IVF_VERSION = 1
+INDEX_KINDS = ("flat", "ivf")
+CHUNK = 16384   # rows upcast at a time when scoring float16 storage
+
+def l2_normalize(x):
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+def truncate(x, dims=None):
+    # Matryoshka-style: keep the leading dims (the model front-loads information there)
+    return x if not dims else x[..., :dims]
+
+def top_k_rows(scores, k):
+    """Row-wise top_k over a (q, n) score matrix: (q, k) indices, best first."""
+    n = scores.shape[1]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < n else np.tile(np.arange(n), (scores.shape[0], 1))
+    part = np.take_along_axis(scores, idx, axis=1)
+    return np.take_along_axis(idx, np.argsort(-part, axis=1, kind="stable"), axis=1)
+
+def top_k(scores, k):
+    """Indices of the k highest scores, best first. O(n) selection + O(k log k) sort."""
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(n)
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+class VectorIndex:
+    exact = True
+
+    def __init__(self, ids, mat, model=None, dims=None, normalized=False):
+        self._init_rows(ids, model, dims)
+        # rows normalized by write_store are used as they are (memmap, float16 included);
+        # older stores and truncated rows are normalized into a float32 copy
+        self.mat = mat if normalized and not dims else l2_normalize(truncate(mat, dims))
+
+    def _init_rows(self, ids, model, dims):
+        self.ids = list(ids)
+        self.model = model
+        self.dims = dims
+        self.pos = {tid: i for i, tid in enumerate(self.ids)}
+
+    @classmethod
+    def from_store(cls, base, model=None, dims=None):
+        ids, mat, header = open_store(base, model=model)
+        return cls(ids, mat, model=header["model"], dims=dims, normalized=header.get("normalized", False))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dim(self):
+        return self.mat.shape[1]
+
+    @property
+    def nbytes(self):
+        return self.mat.nbytes
+
+    def prep(self, q):
+        return l2_normalize(truncate(np.asarray(q, dtype=np.float32), self.dims))
+
+    # scoring hooks over prepared (truncated, normalized) queries; quantized indexes override these
+    def score_rows(self, qn, rows=None):
+        mat = self.mat if rows is None else self.mat[rows]
+        if mat.dtype == np.float32:
+            return mat @ qn
+        out = np.empty(len(mat), dtype=np.float32)
+        for i in range(0, len(mat), CHUNK):
+            out[i:i + CHUNK] = mat[i:i + CHUNK].astype(np.float32) @ qn
+        return out
+
+    def score_batch(self, Qn):
+        if self.mat.dtype == np.float32:
+            return Qn @ self.mat.T
+        out = np.empty((len(Qn), len(self.mat)), dtype=np.float32)
+        for i in range(0, len(self.mat), CHUNK):
+            out[:, i:i + CHUNK] = Qn @ self.mat[i:i + CHUNK].astype(np.float32).T
+        return out
+
+    def scores(self, q):
+        # cosine similarity of the query against every row
+        return self.score_rows(self.prep(q))
+
+    def search(self, q, k=10, mask=None):
+        """Return (row indices, cosine scores) of the k nearest rows, best first.
+
+        With a boolean mask only feasible rows are ranked; when the mask is selective
+        only those rows are scored at all.
+        """
+        if mask is None:
+            sims = self.scores(q)
+            idx = top_k(sims, k)
+            return idx, sims[idx]
+        rows = np.flatnonzero(mask)
+        if len(rows) * 4 < len(self):
+            sims = self.score_rows(self.prep(q), rows)
+            sel = top_k(sims, k)
+            return rows[sel], sims[sel]
+        sims = np.where(mask, self.scores(q), -np.inf)
+        idx = top_k(sims, min(k, len(rows)))
+        return idx, sims[idx]
+
+    def search_batch(self, Q, k=10, masks=None):
+        """Score a (q, dim) batch of queries with one GEMM; returns (q, k) indices and scores.
+
+        masks is an optional (q, n) feasibility matrix; rows that run out of feasible
+        trims are padded with -inf scores.
+        """
+        sims = self.score_batch(self.prep(Q))
+        if masks is not None:
+            sims[~masks] = -np.inf
+        idx = top_k_rows(sims, k)
+        return idx, np.take_along_axis(sims, idx, axis=1)
+
+
+# ---------- IVF (approximate) ----------
+def kmeans(X, nlist, n_iter=20, seed=0, chunk=65536):
+    """Spherical k-means on L2-normalized rows; returns (centroids, assignment)."""
+    rng = np.random.default_rng(seed)
+    n = X.shape[0]
+    C = np.asarray(X[rng.choice(n, size=nlist, replace=False)], dtype=np.float32)
+    assign = np.zeros(n, dtype=np.int32)
+    for _ in range(n_iter):
+        for i in range(0, n, chunk):
+            assign[i:i + chunk] = np.argmax(X[i:i + chunk] @ C.T, axis=1)
+        sums = np.zeros_like(C)
+        np.add.at(sums, assign, X)
+        counts = np.bincount(assign, minlength=nlist)
+        empty = np.flatnonzero(counts == 0)
+        # reseed empty lists with random rows so every list stays in use
+        sums[empty] = X[rng.choice(n, size=len(empty), replace=False)]
+        C = l2_normalize(sums)
+    for i in range(0, n, chunk):
+        assign[i:i + chunk] = np.argmax(X[i:i + chunk] @ C.T, axis=1)
+    return C, assign
+
+def store_digest(header):
+    # ties a saved IVF to the exact store rows it was trained on
+    rows = header.get("hashes") or header["ids"]
+    return hashlib.sha256("\n".join(rows).encode("utf-8")).hexdigest()
+
+class IVFIndex(VectorIndex):
+    """Inverted-file index: only rows in the nprobe closest k-means lists are scored.
+
+    nlist trades build time and memory for query speed; nprobe trades latency for
+    recall (nprobe == nlist is exact).
+    """
+    exact = False
+
+    def __init__(self, ids, mat, model=None, dims=None, normalized=False, nlist=None, nprobe=8, centroids=None,
+                 assign=None, seed=0):
+        super().__init__(ids, mat, model=model, dims=dims, normalized=normalized)
+        n = len(self.ids)
+        if centroids is None:
+            nlist = nlist or max(1, int(4 * np.sqrt(n)))
+            centroids, assign = kmeans(self.mat, min(nlist, n), seed=seed)
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.assign = np.asarray(assign, dtype=np.int32)
+        self.nlist = self.centroids.shape[0]
+        self.nprobe = nprobe
+        # rows grouped by list; list c is order[offsets[c]:offsets[c + 1]]
+        self.order = np.argsort(self.assign, kind="stable")
+        self.offsets = np.searchsorted(self.assign[self.order], np.arange(self.nlist + 1))
+
+    def _probe(self, qn, nprobe):
+        lists = top_k(self.centroids @ qn, min(nprobe, self.nlist))
+        return np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in lists])
+
+    def search(self, q, k=10, mask=None, nprobe=None):
+        qn = self.prep(q)
+        nprobe = nprobe or self.nprobe
+        while True:
+            rows = self._probe(qn, nprobe)
+            if mask is not None:
+                rows = rows[mask[rows]]
+            # too few feasible rows in the probed lists: widen the probe adaptively
+            if len(rows) >= k or nprobe >= self.nlist:
+                break
+            nprobe *= 2
+        sims = self.score_rows(qn, rows)
+        sel = top_k(sims, k)
+        return rows[sel], sims[sel]
+
+    def search_batch(self, Q, k=10, masks=None, nprobe=None):
+        Q = np.atleast_2d(Q)
+        idx = np.zeros((len(Q), k), dtype=np.int64)
+        sims = np.full((len(Q), k), -np.inf, dtype=np.float32)
+        for i, q in enumerate(Q):
+            r, s = self.search(q, k, mask=None if masks is None else masks[i], nprobe=nprobe)
+            idx[i, :len(r)] = r
+            sims[i, :len(s)] = s
+        return idx, sims
+
+    def save(self, base, header):
+        path = base + ".ivf.npz"
+        meta = {"version": IVF_VERSION, "nprobe": self.nprobe, "dims": self.dims, "store": store_digest(header)}
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, centroids=self.centroids, assign=self.assign, meta=np.array(json.dumps(meta)))
+        os.replace(path + ".tmp", path)
+        return path
+
+    @classmethod
+    def from_store(cls, base, model=None, dims=None, nprobe=None, **build_kw):
+        """Load <base>.ivf.npz if it matches the store, otherwise train a new one."""
+        ids, mat, header = open_store(base, model=model)
+        normalized = header.get("normalized", False)
+        path = base + ".ivf.npz"
+        if os.path.exists(path):
+            with np.load(path) as z:
+                meta = json.loads(str(z["meta"]))
+                if (meta.get("version") == IVF_VERSION and meta.get("store") == store_digest(header)
+                        and meta.get("dims") == dims):
+                    return cls(ids, mat, model=header["model"], dims=dims, normalized=normalized,
+                               nprobe=nprobe or meta["nprobe"],
+                               centroids=z["centroids"], assign=z["assign"])
+        return cls(ids, mat, model=header["model"], dims=dims, normalized=normalized, nprobe=nprobe or 8, **build_kw)
+
+def open_index(base, model=None, kind="flat", quant=None, dims=None, **kw):
+    """kind: flat|ivf; quant: None|int8|pq (flat only); dims: Matryoshka truncation."""
+    if quant:
+        if kind != "flat":
+            raise ValueError("quantized storage is only supported with the flat index")
+        from quantize import open_quantized
+        return open_quantized(base, model=model, mode=quant, dims=dims, **kw)
+    if kind == "flat":
+        return VectorIndex.from_store(base, model=model, dims=dims)
+    if kind == "ivf":
+        return IVFIndex.from_store(base, model=model, dims=dims, **kw)
+    raise ValueError(f"unknown index kind {kind!r}, expected one of {INDEX_KINDS}")
+
+def build_ivf(base, nlist=None, nprobe=8, model=None, dims=None):
+    ids, mat, header = open_store(base, model=model)
+    index = IVFIndex(ids, mat, model=header["model"], dims=dims, normalized=header.get("normalized", False),
+                     nlist=nlist, nprobe=nprobe)
+    index.save(base, header)
+    return index
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Train and save an IVF index next to the vector store")
+    ap.add_argument("--store", default="data/trim_vectors")
+    ap.add_argument("--nlist", type=int, default=None, help="k-means lists (default 4*sqrt(n))")
+    ap.add_argument("--nprobe", type=int, default=8, help="lists scored per query")
+    ap.add_argument("--dims", type=int, default=None, help="Matryoshka truncation (must match VECTOR_DIMS)")
+    args = ap.parse_args()
+    if not os.path.exists(args.store + ".npy"):
+        sys.exit(f"{args.store}.npy not found")
+    ix = build_ivf(args.store, nlist=args.nlist, nprobe=args.nprobe, dims=args.dims)
+    print(f"✅ Wrote IVF index ({ix.nlist} lists, nprobe={ix.nprobe}) to {args.store}.ivf.npz")
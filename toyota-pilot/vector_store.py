@@ -0,0 +1,86 @@
+# vector_store.py
+# Binary trim vector store: <base>.npy holds the (n, dim) matrix and is opened with
+# np.memmap, <base>.meta.json is the header (format version, embedding model, dim,
+# dtype) plus the row -> trim id index and, when written by embed_build.py, the
+# per-row content hashes used for incremental rebuilds. Rows are L2-normalized when
+# written ("normalized": true), so the index can score the memmap without a copy.
+import os, sys, json, hashlib, argparse, numpy as np
+
+STORE_VERSION = 1
+DTYPES = ("float32", "float16")
+
+def store_paths(base):
+    return base + ".npy", base + ".meta.json"
+
+def content_hash(text, model):
+    # a vector is only reusable for the same text embedded by the same model
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+def write_store(base, ids, vectors, model, dtype="float32", hashes=None):
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {DTYPES}, got {dtype!r}")
+    ids = list(ids)
+    mat = np.asarray(vectors, dtype=np.float32)
+    if mat.ndim != 2 or mat.shape[0] != len(ids):
+        raise ValueError(f"expected {len(ids)} vectors, got array of shape {mat.shape}")
+    if hashes is not None and len(hashes) != len(ids):
+        raise ValueError(f"expected {len(ids)} content hashes, got {len(hashes)}")
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    mat = (mat / norms).astype(dtype)
+    npy_path, meta_path = store_paths(base)
+    header = {
+        "version": STORE_VERSION,
+        "model": model,
+        "dim": int(mat.shape[1]),
+        "dtype": dtype,
+        "count": len(ids),
+        "normalized": True,
+        "ids": ids,
+    }
+    if hashes is not None:
+        header["hashes"] = list(hashes)
+    # write both files next to their targets, then swap them in
+    with open(npy_path + ".tmp", "wb") as f:
+        np.save(f, mat)
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(header, f)
+    os.replace(npy_path + ".tmp", npy_path)
+    os.replace(meta_path + ".tmp", meta_path)
+    return header
+
+def read_header(base):
+    with open(store_paths(base)[1]) as f:
+        header = json.load(f)
+    if header.get("version") != STORE_VERSION:
+        raise ValueError(f"{base}: unsupported vector store version {header.get('version')!r}")
+    return header
+
+def open_store(base, model=None):
+    """Return (ids, mat, header); mat is a read-only memmap over the .npy file."""
+    header = read_header(base)
+    if model and header["model"] != model:
+        raise ValueError(f"{base} was built with {header['model']!r}, expected {model!r}")
+    mat = np.load(store_paths(base)[0], mmap_mode="r")
+    if mat.shape != (header["count"], header["dim"]):
+        raise ValueError(f"{base}: header says {header['count']}x{header['dim']}, file is {mat.shape}")
+    return header["ids"], mat, header
+
+def convert_json(src, base, model, dtype="float32"):
+    # one-shot migration from the old {id: [floats]} trim_vectors.json
+    with open(src) as f:
+        vecs = json.load(f)
+    ids = list(vecs.keys())
+    return write_store(base, ids, [vecs[i] for i in ids], model, dtype=dtype)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Convert trim_vectors.json to the binary vector store")
+    ap.add_argument("--src", default="data/trim_vectors.json")
+    ap.add_argument("--out", default="data/trim_vectors")
+    ap.add_argument("--model", default="openai/text-embedding-3-small")
+    ap.add_argument("--dtype", default="float32", choices=DTYPES)
+    args = ap.parse_args()
+    if not os.path.exists(args.src):
+        sys.exit(f"{args.src} not found")
+    h = convert_json(args.src, args.out, args.model, dtype=args.dtype)
+    print(f"✅ Wrote {h['count']}x{h['dim']} {h['dtype']} vectors to {args.out}.npy")